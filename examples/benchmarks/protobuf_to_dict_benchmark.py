@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+
+Compares the compiled protobuf_to_dict converter against the uncompiled
+reference implementation on dense GET_MAP_OBJECTS and GET_INVENTORY responses.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import random
+import timeit
+import argparse
+
+# add directory of this file to PATH, so that the package will be found
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "../.."))
+
+from pgoapi.protobuf_to_dict import protobuf_to_dict, _protobuf_to_dict_uncompiled
+
+from POGOProtos.Networking.Responses_pb2 import GetMapObjectsResponse, GetInventoryResponse
+
+
+def fill_pokemon_data(pokemon, i):
+    pokemon.id = random.getrandbits(64)
+    pokemon.pokemon_id = random.randint(1, 151)
+    pokemon.cp = random.randint(10, 3000)
+    pokemon.stamina = pokemon.stamina_max = random.randint(10, 200)
+    pokemon.move_1 = 14
+    pokemon.move_2 = 100
+    pokemon.height_m = random.random()
+    pokemon.weight_kg = random.random() * 100
+    pokemon.individual_attack = random.randint(0, 15)
+    pokemon.individual_defense = random.randint(0, 15)
+    pokemon.individual_stamina = random.randint(0, 15)
+    pokemon.cp_multiplier = random.random()
+    pokemon.pokeball = 1
+    pokemon.captured_cell_id = random.getrandbits(63)
+    pokemon.creation_time_ms = 1468000000000 + i
+    pokemon.nickname = u'poke-{}'.format(i)
+
+
+def build_map_objects_response(cells):
+    response = GetMapObjectsResponse()
+    response.status = 1
+    for c in range(cells):
+        cell = response.map_cells.add()
+        cell.s2_cell_id = random.getrandbits(63)
+        cell.current_timestamp_ms = 1468000000000 + c
+        for i in range(4):
+            fort = cell.forts.add()
+            fort.id = u'{:032x}.16'.format(random.getrandbits(128))
+            fort.last_modified_timestamp_ms = 1468000000000 + i
+            fort.latitude = 40.0 + random.random()
+            fort.longitude = -73.0 + random.random()
+            fort.enabled = True
+            fort.type = 1
+            fort.active_fort_modifier = os.urandom(8)
+            fort.lure_info.fort_id = fort.id
+            fort.lure_info.encounter_id = random.getrandbits(64)
+            fort.lure_info.lure_expires_timestamp_ms = 1468000000000
+        for i in range(6):
+            spawn = cell.spawn_points.add()
+            spawn.latitude = 40.0 + random.random()
+            spawn.longitude = -73.0 + random.random()
+        for i in range(3):
+            wild = cell.wild_pokemons.add()
+            wild.encounter_id = random.getrandbits(64)
+            wild.last_modified_timestamp_ms = 1468000000000
+            wild.latitude = 40.0 + random.random()
+            wild.longitude = -73.0 + random.random()
+            wild.spawn_point_id = u'{:x}'.format(random.getrandbits(40))
+            wild.time_till_hidden_ms = random.randint(1000, 900000)
+            fill_pokemon_data(wild.pokemon_data, i)
+            nearby = cell.nearby_pokemons.add()
+            nearby.pokemon_id = wild.pokemon_data.pokemon_id
+            nearby.distance_in_meters = random.random() * 200
+        cell.deleted_objects.extend([u'obj-{}'.format(i) for i in range(2)])
+    return response
+
+
+def build_inventory_response(pokemons, items):
+    response = GetInventoryResponse()
+    item_data = response.inventory_delta.inventory_items.add().inventory_item_data
+    item_ids = [v.number for v in item_data.item.DESCRIPTOR.fields_by_name['item_id'].enum_type.values]
+    family_ids = [v.number for v in item_data.candy.DESCRIPTOR.fields_by_name['family_id'].enum_type.values]
+    response.Clear()
+    response.success = True
+    response.inventory_delta.new_timestamp_ms = 1468000000000
+    for i in range(pokemons):
+        entry = response.inventory_delta.inventory_items.add()
+        entry.modified_timestamp_ms = 1468000000000 + i
+        fill_pokemon_data(entry.inventory_item_data.pokemon_data, i)
+    for i in range(items):
+        entry = response.inventory_delta.inventory_items.add()
+        entry.inventory_item_data.item.item_id = item_ids[i % len(item_ids)]
+        entry.inventory_item_data.item.count = random.randint(1, 100)
+        entry = response.inventory_delta.inventory_items.add()
+        entry.inventory_item_data.candy.family_id = family_ids[i % len(family_ids)]
+        entry.inventory_item_data.candy.candy = random.randint(1, 100)
+    return response
+
+
+def benchmark(name, message, number):
+    serialized = message.SerializeToString()
+
+    assert protobuf_to_dict(message) == _protobuf_to_dict_uncompiled(message), 'Output mismatch for {}'.format(name)
+    assert protobuf_to_dict(message, use_enum_labels=True) == _protobuf_to_dict_uncompiled(message, use_enum_labels=True), \
+        'Output mismatch for {} (enum labels)'.format(name)
+
+    reference = min(timeit.repeat(lambda: _protobuf_to_dict_uncompiled(message), number=number, repeat=3)) / number
+    compiled = min(timeit.repeat(lambda: protobuf_to_dict(message), number=number, repeat=3)) / number
+
+    print('{:<20} {:>8} bytes  reference {:8.3f} ms  compiled {:8.3f} ms  speedup {:5.2f}x'.format(
+        name, len(serialized), reference * 1000, compiled * 1000, reference / compiled))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", help="Conversions per measurement", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(1)
+
+    benchmark('GET_MAP_OBJECTS', build_map_objects_response(21), args.number)
+    benchmark('GET_INVENTORY', build_inventory_response(250, 30), args.number)
+
+if __name__ == '__main__':
+    main()
@@ -30,7 +30,6 @@ import sys
 import json
 import time
 import struct
-import random
 import logging
 import requests
 import argparse
@@ -39,13 +38,13 @@ import pprint
 # add directory of this file to PATH, so that the package will be found
 sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)),".."))
 
-from pgoapi import PGoApi
+from pgoapi import PGoApi, ExpiryStore
 from pgoapi.utilities import f2i, h2f
 from pgoapi import utilities as util
+from pgoapi.scan_planner import plan_scan
 
 from google.protobuf.internal import encoder
 from geopy.geocoders import GoogleV3
-from s2sphere import Cell, CellId, LatLng
 
 log = logging.getLogger(__name__)
 
@@ -60,22 +59,6 @@ def get_pos_by_name(location_name):
 
     return (loc.latitude, loc.longitude, loc.altitude)
 
-def get_cell_ids(lat, long, radius = 10):
-    origin = CellId.from_lat_lng(LatLng.from_degrees(lat, long)).parent(15)
-    walk = [origin.id()]
-    right = origin.next()
-    left = origin.prev()
-
-    # Search around provided radius
-    for i in range(radius):
-        walk.append(right.id())
-        walk.append(left.id())
-        right = right.next()
-        left = left.prev()
-
-    # Return everything
-    return sorted(walk)
-
 def encode(cellid):
     output = []
     encoder._VarintEncoder()(output.append, cellid)
@@ -162,21 +145,17 @@ def main():
     find_poi(api, position[0], position[1])
 
 def find_poi(api, lat, lng):
-    poi = {'pokemons': {}, 'forts': []}
-    step_size = 0.0015
-    step_limit = 49
-    coords = generate_spiral(lat, lng, step_size, step_limit)
-    for coord in coords:
-        lat = coord['lat']
-        lng = coord['lng']
+    # pokemon are dropped from the store once they are hidden again
+    pokemons = ExpiryStore()
+    # hexagonal grid of scan positions covering 500m around the start
+    coords = plan_scan(lat, lng, radius = 500)
+    for lat, lng in coords:
         api.set_position(lat, lng, 0)
 
 
-        #get_cellid was buggy -> replaced through get_cell_ids from pokecli
-        #timestamp gets computed a different way:
-        cell_ids = get_cell_ids(lat, lng)
-        timestamps = [0,] * len(cell_ids)
-        response_dict = api.get_map_objects(latitude = util.f2i(lat), longitude = util.f2i(lng), since_timestamp_ms = timestamps, cell_id = cell_ids)
+        #query_map covers the cells around the position and tracks since_timestamp_ms of every cell,
+        #cells scanned before only return changes
+        response_dict = api.query_map(lat, lng)
         if (response_dict['responses']):
             if 'status' in response_dict['responses']['GET_MAP_OBJECTS']:
                 if response_dict['responses']['GET_MAP_OBJECTS']['status'] == 1:
@@ -185,13 +164,14 @@ def find_poi(api, lat, lng):
                             for pokemon in map_cell['wild_pokemons']:
                                 pokekey = get_key_from_pokemon(pokemon)
                                 pokemon['hides_at'] = time.time() + pokemon['time_till_hidden_ms']/1000
-                                poi['pokemons'][pokekey] = pokemon
+                                pokemons.add_object(pokekey, pokemon)
 
         # time.sleep(0.51)
+    poi = {'pokemons': dict(pokemons.items()), 'forts': []}
     # new dict, binary data
     # print('POI dictionary: \n\r{}'.format(json.dumps(poi, indent=2)))
     print('POI dictionary: \n\r{}'.format(pprint.PrettyPrinter(indent=4).pformat(poi)))
-    print('Open this in a browser to see the path the spiral search took:')
+    print('Open this in a browser to see the path the search took:')
     print_gmaps_dbug(coords)
 
 def get_key_from_pokemon(pokemon):
@@ -199,33 +179,9 @@ def get_key_from_pokemon(pokemon):
 
 def print_gmaps_dbug(coords):
     url_string = 'http://maps.googleapis.com/maps/api/staticmap?size=400x400&path='
-    for coord in coords:
-        url_string += '{},{}|'.format(coord['lat'], coord['lng'])
+    for lat, lng in coords:
+        url_string += '{},{}|'.format(lat, lng)
     print(url_string[:-1])
 
-def generate_spiral(starting_lat, starting_lng, step_size, step_limit):
-    coords = [{'lat': starting_lat, 'lng': starting_lng}]
-    steps,x,y,d,m = 1, 0, 0, 1, 1
-    rlow = 0.0
-    rhigh = 0.0005
-
-    while steps < step_limit:
-        while 2 * x * d < m and steps < step_limit:
-            x = x + d
-            steps += 1
-            lat = x * step_size + starting_lat + random.uniform(rlow, rhigh)
-            lng = y * step_size + starting_lng + random.uniform(rlow, rhigh)
-            coords.append({'lat': lat, 'lng': lng})
-        while 2 * y * d < m and steps < step_limit:
-            y = y + d
-            steps += 1
-            lat = x * step_size + starting_lat + random.uniform(rlow, rhigh)
-            lng = y * step_size + starting_lng + random.uniform(rlow, rhigh)
-            coords.append({'lat': lat, 'lng': lng})
-
-        d = -1 * d
-        m = m + 1
-    return coords
-
 if __name__ == '__main__':
     main()
@@ -27,6 +27,7 @@ from __future__ import absolute_import
 
 from pgoapi.exceptions import PleaseInstallProtobufVersion3
 
+import sys
 import pkg_resources
 import logging
 
@@ -50,6 +51,24 @@ if (not protobuf_exist) or (int(protobuf_version[:1]) < 3):
 from pgoapi.pgoapi import PGoApi
 from pgoapi.rpc_api import RpcApi
 from pgoapi.auth import Auth
+from pgoapi.transport import HttpTransport
+from pgoapi.rate_limiter import AdaptiveRateLimiter
+from pgoapi.retry import RetryPolicy, ErrorPolicy
+from pgoapi.credential_store import CredentialStore
+from pgoapi.auth_refresher import AuthRefresher
+from pgoapi.account_pool import AccountPool
+from pgoapi.bulk_login import BulkLogin, LoginResult
+from pgoapi.settings_cache import SettingsCache
+from pgoapi.item_templates import ItemTemplateStore
+from pgoapi.inventory import Inventory
+from pgoapi.cell_timestamps import CellTimestampCache
+from pgoapi.map_state import MapState, MapChange
+from pgoapi.spatial_index import SpatialIndex
+from pgoapi.expiry_store import ExpiryStore
+
+if sys.version_info >= (3, 5):
+    from pgoapi.async_pgoapi import AsyncPGoApi, AsyncPGoApiRequest
+    from pgoapi.async_transport import AsyncHttpTransport, AiohttpTransport
 
 logging.getLogger("pgoapi").addHandler(logging.NullHandler())
 logging.getLogger("rpc_api").addHandler(logging.NullHandler())
@@ -57,6 +76,21 @@ logging.getLogger("utilities").addHandler(logging.NullHandler())
 logging.getLogger("auth").addHandler(logging.NullHandler())
 logging.getLogger("auth_ptc").addHandler(logging.NullHandler())
 logging.getLogger("auth_google").addHandler(logging.NullHandler())
+logging.getLogger("transport").addHandler(logging.NullHandler())
+logging.getLogger("async_transport").addHandler(logging.NullHandler())
+logging.getLogger("metrics").addHandler(logging.NullHandler())
+logging.getLogger("rate_limiter").addHandler(logging.NullHandler())
+logging.getLogger("credential_store").addHandler(logging.NullHandler())
+logging.getLogger("auth_refresher").addHandler(logging.NullHandler())
+logging.getLogger("account_pool").addHandler(logging.NullHandler())
+logging.getLogger("bulk_login").addHandler(logging.NullHandler())
+logging.getLogger("settings_cache").addHandler(logging.NullHandler())
+logging.getLogger("item_templates").addHandler(logging.NullHandler())
+logging.getLogger("inventory").addHandler(logging.NullHandler())
+logging.getLogger("map_state").addHandler(logging.NullHandler())
+logging.getLogger("spatial_index").addHandler(logging.NullHandler())
+logging.getLogger("expiry_store").addHandler(logging.NullHandler())
+logging.getLogger("scan_planner").addHandler(logging.NullHandler())
 
 try:
     import requests.packages.urllib3
@@ -0,0 +1,298 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+from collections import deque
+
+from pgoapi.utilities import get_map_cells
+from pgoapi.exceptions import AuthException, NotLoggedInException, NoAvailableAccountException
+
+# repeated fields of a map cell, a map response without any of them in any cell is "empty"
+MAP_CELL_OBJECT_FIELDS = ('forts', 'spawn_points', 'fort_summaries', 'decimated_spawn_points',
+                          'wild_pokemons', 'catchable_pokemons', 'nearby_pokemons')
+
+
+def is_empty_map_response(response):
+    """ True if a response contains a successful GET_MAP_OBJECTS result without a single map object """
+    cells = get_map_cells(response)
+    if cells is None:
+        return False
+
+    for cell in cells:
+        if isinstance(cell, dict):
+            if any(cell.get(field) for field in MAP_CELL_OBJECT_FIELDS):
+                return False
+        elif any(getattr(cell, field) for field in MAP_CELL_OBJECT_FIELDS):
+            return False
+    return True
+
+
+def is_incremental_map_request(request):
+    """ True if a PGoApiRequest contains a GET_MAP_OBJECTS asking only for changes since earlier queries """
+    kwargs = request.get_method_args('GET_MAP_OBJECTS')
+    return bool(kwargs) and any(kwargs.get('since_timestamp_ms') or ())
+
+
+class _Account:
+
+    def __init__(self, api):
+        self.api = api
+        self.in_use = False
+        self.last_used = 0.0
+        self.quarantined_until = 0.0
+        self.quarantine_reason = None
+        self.empty_responses = 0
+        self.requests = 0
+        self.failures = 0
+        self.quarantines = 0
+
+    def get_rate_delay(self):
+        rate_limiter = self.api.get_rate_limiter()
+        if rate_limiter is None:
+            return 0.0
+        return rate_limiter.get_delay()
+
+    def get_stats(self, now):
+        return {
+            'username': self.api.get_auth_provider().get_username() if self.api.get_auth_provider() else None,
+            'in_use': self.in_use,
+            'last_used': self.last_used,
+            'quarantined': self.quarantined_until > now,
+            'quarantine_reason': self.quarantine_reason if self.quarantined_until > now else None,
+            'requests': self.requests,
+            'failures': self.failures,
+            'quarantines': self.quarantines,
+        }
+
+
+class AccountPool:
+    """
+    Dispatches chained requests over many logged-in PGoApi instances.
+
+    Every request is sent by the least recently used account which is idle,
+    not quarantined and - if it has a rate limiter - ready to send without
+    waiting. An account serves one request at a time.
+
+    Accounts failing with an auth error (NotLoggedInException, AuthException)
+    are quarantined right away, accounts returning `max_empty_responses`
+    map responses in a row without any map object (the usual sign of a
+    flagged account) as well. Quarantined accounts rejoin the pool after
+    `quarantine_time` seconds.
+
+        pool.add(api)
+        response = pool.call(lambda req: req.get_map_objects(...), position=(lat, lng, alt))
+
+    :param quarantine_time: seconds an account is kept out of dispatching
+    :param max_empty_responses: consecutive empty map responses which quarantine an account
+    :param stats_window: seconds the throughput in get_stats() is averaged over
+    """
+
+    def __init__(self, quarantine_time = 600, max_empty_responses = 3, stats_window = 60):
+
+        self.log = logging.getLogger(__name__)
+
+        self._quarantine_time = quarantine_time
+        self._max_empty_responses = max_empty_responses
+        self._stats_window = stats_window
+
+        self._accounts = {}
+        self._condition = threading.Condition()
+
+        self._completed = deque()
+        self._requests = 0
+        self._failures = 0
+        self._quarantines = 0
+
+    def add(self, api):
+        with self._condition:
+            if id(api) not in self._accounts:
+                self._accounts[id(api)] = _Account(api)
+            self._condition.notify()
+
+    def remove(self, api):
+        with self._condition:
+            self._accounts.pop(id(api), None)
+
+    def get_accounts(self):
+        with self._condition:
+            return [account.api for account in self._accounts.values()]
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def _select(self, now):
+        best = None
+        best_key = None
+        for account in self._accounts.values():
+            if account.in_use or account.quarantined_until > now:
+                continue
+
+            key = (account.get_rate_delay(), account.last_used)
+            if best is None or key < best_key:
+                best, best_key = account, key
+        return best
+
+    def _get_wait(self, now):
+        """ Seconds until the next quarantine ends, None if only a release can free an account """
+        ends = [account.quarantined_until - now for account in self._accounts.values()
+                if not account.in_use and account.quarantined_until > now]
+        return min(ends) if ends else None
+
+    def acquire(self, timeout = None):
+        """
+        Reserves the next account for exclusive use, waiting up to timeout
+        seconds (None waits forever) for one to become available. Every
+        acquired account has to be given back with release().
+        """
+        end = None if timeout is None else time.time() + timeout
+
+        with self._condition:
+            while True:
+                now = time.time()
+                account = self._select(now)
+                if account is not None:
+                    account.in_use = True
+                    account.last_used = now
+                    return account.api
+
+                wait = self._get_wait(now)
+                if end is not None:
+                    if now >= end:
+                        raise NoAvailableAccountException('No healthy account available within {}s'.format(timeout))
+                    wait = end - now if wait is None else min(wait, end - now)
+                self._condition.wait(wait)
+
+    def release(self, api, response = None, error = None, incremental = False):
+        """
+        Returns an account to the pool and updates its health with the outcome
+        of its request. Empty map responses of incremental queries (see
+        is_incremental_map_request()) do not count against the account.
+        """
+        with self._condition:
+            account = self._accounts.get(id(api))
+            if account is None:
+                return
+
+            now = time.time()
+            account.in_use = False
+            account.requests += 1
+            self._requests += 1
+            self._completed.append(now)
+            self._trim_completed(now)
+
+            if isinstance(error, (NotLoggedInException, AuthException)) or isinstance(response, NotLoggedInException):
+                self._quarantine(account, now, 'auth error')
+            elif error is not None or not response:
+                account.failures += 1
+                self._failures += 1
+            elif is_empty_map_response(response):
+                # cells queried with since_timestamp_ms are empty if nothing changed
+                if not incremental:
+                    account.empty_responses += 1
+                    if account.empty_responses >= self._max_empty_responses:
+                        self._quarantine(account, now, 'empty map responses')
+            else:
+                account.empty_responses = 0
+
+            self._condition.notify()
+
+    def quarantine(self, api, duration = None, reason = 'manual'):
+        with self._condition:
+            account = self._accounts.get(id(api))
+            if account is not None:
+                self._quarantine(account, time.time(), reason, duration)
+
+    def _quarantine(self, account, now, reason, duration = None):
+        if duration is None:
+            duration = self._quarantine_time
+
+        account.failures += 1
+        account.quarantines += 1
+        account.empty_responses = 0
+        account.quarantined_until = now + duration
+        account.quarantine_reason = reason
+        self._failures += 1
+        self._quarantines += 1
+
+        self.log.warning('Quarantined account %s for %ss (%s)', account.get_stats(now)['username'], duration, reason)
+
+    def call(self, build, position = None, timeout = None, **kwargs):
+        """
+        Builds a request on the next available account and calls it.
+
+        :param build: callable adding the RPCs to the given PGoApiRequest
+        :param position: (lat, lng, alt) the request is sent from, defaults to the account position
+        :param timeout: seconds to wait for an available account
+        :param kwargs: passed to PGoApiRequest.call()
+        """
+        api = self.acquire(timeout)
+        response = error = None
+        incremental = False
+        try:
+            request = api.create_request()
+            if position is not None:
+                request.set_position(*position)
+            build(request)
+
+            incremental = is_incremental_map_request(request)
+            response = request.call(**kwargs)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.release(api, response, error, incremental)
+
+    def _trim_completed(self, now):
+        while self._completed and self._completed[0] < now - self._stats_window:
+            self._completed.popleft()
+
+    def get_stats(self):
+        with self._condition:
+            now = time.time()
+            self._trim_completed(now)
+
+            quarantined = sum(1 for account in self._accounts.values() if account.quarantined_until > now)
+            in_use = sum(1 for account in self._accounts.values() if account.in_use)
+            return {
+                'accounts': len(self._accounts),
+                'available': len(self._accounts) - quarantined - in_use,
+                'in_use': in_use,
+                'quarantined': quarantined,
+                'requests': self._requests,
+                'failures': self._failures,
+                'quarantines': self._quarantines,
+                'throughput': len(self._completed) / float(self._stats_window),
+            }
+
+    def get_account_stats(self):
+        with self._condition:
+            now = time.time()
+            return [account.get_stats(now) for account in self._accounts.values()]
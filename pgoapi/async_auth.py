@@ -0,0 +1,157 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import re
+import json
+import asyncio
+
+from pgoapi.auth_ptc import AuthPtc
+from pgoapi.auth_google import AuthGoogle
+from pgoapi.async_transport import AiohttpTransport
+from pgoapi.exceptions import DeadlineExceededException
+
+
+class _AsyncRelogin:
+
+    async def relogin(self, deadline = None, failed_token = None):
+        """ Coroutine version of Auth.relogin() """
+        if self._username is None or self._password is None:
+            return False
+
+        # created on first use, asyncio locks bind to the event loop running at that time
+        if getattr(self, '_async_relogin_lock', None) is None:
+            self._async_relogin_lock = asyncio.Lock()
+
+        async with self._async_relogin_lock:
+            if failed_token is not None and self._auth_token != failed_token:
+                self.log.debug('Re-login for %s already done', self._username)
+                return True
+
+            self.log.info('Re-login for: %s', self._username)
+            self.clear_ticket()
+
+            fresh = self.__class__()
+            fresh.set_timeout(self._timeout)
+            if not await fresh.login(self._username, self._password, deadline = deadline):
+                return False
+
+            self._auth_token, self._token_expiry = fresh.get_token(), fresh.get_token_expiry()
+            self._login = True
+            return True
+
+    async def refresh_token(self, deadline = None):
+        if self._username is None or self._password is None:
+            return False
+
+        fresh = self.__class__()
+        fresh.set_timeout(self._timeout)
+        if not await fresh.login(self._username, self._password, deadline = deadline):
+            return False
+
+        self._auth_token, self._token_expiry = fresh.get_token(), fresh.get_token_expiry()
+        return True
+
+
+class AsyncAuthPtc(_AsyncRelogin, AuthPtc):
+    """
+    Non-blocking PTC login running on an AsyncHttpTransport.
+
+    The transport has to keep cookies between the login steps. If none is
+    given, a private AiohttpTransport is created for the login and closed
+    afterwards.
+    """
+
+    def __init__(self, transport = None):
+        AuthPtc.__init__(self)
+
+        self._session = None
+        self._transport = transport
+
+    async def login(self, username, password, deadline = None):
+
+        self.log.info('Login for: %s', username)
+        self._username = username
+        self._password = password
+
+        transport = self._transport or AiohttpTransport(headers={}, cookies=True)
+        try:
+            return await self._login(transport, username, password, deadline)
+        except asyncio.TimeoutError:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceededException('Deadline exceeded during PTC login')
+            raise
+        finally:
+            if self._transport is None:
+                await transport.close()
+
+    async def _login(self, transport, username, password, deadline = None):
+
+        head = {'User-Agent': 'niantic'}
+        r = await transport.get(self.PTC_LOGIN_URL, headers=head, timeout=self._get_timeout(deadline))
+
+        data = self._get_login_form(r.content, username, password)
+        if not data:
+            return False
+
+        # the ticket is part of the redirect location, no need to follow it
+        r1 = await transport.post(self.PTC_LOGIN_URL, data, headers=head, allow_redirects=False,
+                                  timeout=self._get_timeout(deadline))
+
+        location = r1.headers.get('Location', '')
+        if 'ticket=' not in location:
+            try:
+                self.log.error('Could not retrieve token: %s', json.loads(r1.content.decode('utf-8'))['errors'][0])
+            except Exception as e:
+                self.log.error('Could not retrieve token! (%s)', str(e))
+            return False
+        ticket = re.sub('.*ticket=', '', location)
+
+        r2 = await transport.post(self.PTC_LOGIN_OAUTH, self._get_oauth_form(ticket), timeout=self._get_timeout(deadline))
+
+        return self._set_access_token(r2.content)
+
+
+
+class AsyncAuthGoogle(_AsyncRelogin, AuthGoogle):
+    """
+    Google login for asyncio users.
+
+    gpsoauth only offers a blocking API, so the login is run in the default
+    executor of the event loop instead of blocking it. On deadline expiry the
+    caller is released, while the executor thread finishes in the background.
+    """
+
+    async def login(self, username, password, deadline = None):
+        loop = asyncio.get_event_loop()
+        future = loop.run_in_executor(None, AuthGoogle.login, self, username, password, deadline)
+        if deadline is None:
+            return await future
+
+        try:
+            return await asyncio.wait_for(future, deadline.get_timeout(None))
+        except asyncio.TimeoutError:
+            raise DeadlineExceededException('Deadline exceeded during Google login')
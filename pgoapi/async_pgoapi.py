@@ -0,0 +1,155 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import asyncio
+
+from pgoapi.pgoapi import PGoApi, PGoApiRequest, _TokenAuth
+from pgoapi.async_auth import AsyncAuthPtc, AsyncAuthGoogle
+from pgoapi.rpc_api import RESPONSE_FORMAT_DICT, RESPONSE_FORMAT_PROTOBUF
+from pgoapi.async_rpc_api import AsyncRpcApi
+from pgoapi.async_transport import AiohttpTransport
+from pgoapi.retry import RetryState, RETRY_AUTH, get_retry_kind
+from pgoapi.utilities import Deadline
+from pgoapi.exceptions import AuthException, NotLoggedInException, ServerBusyOrOfflineException, ServerSideRequestThrottlingException, DeadlineExceededException
+
+
+class AsyncPGoApi(PGoApi):
+    """
+    asyncio flavour of PGoApi.
+
+    Offers the same chaining surface, but call() and login() are coroutines:
+
+        req = api.create_request()
+        req.get_player().get_inventory()
+        response = await req.call()
+
+    All requests share one AsyncHttpTransport (an AiohttpTransport by default).
+    """
+
+    def __init__(self, transport = None, response_format = RESPONSE_FORMAT_DICT):
+        PGoApi.__init__(self, transport or AiohttpTransport(), response_format)
+
+    def create_request(self):
+        request = AsyncPGoApiRequest(self._api_endpoint, self._auth_provider, self._position_lat, self._position_lng, self._position_alt, self._transport, self._response_format, self._rpc_hooks, self._rate_limiter, self._retry_policy)
+        return request
+
+    def _create_auth_provider(self, provider):
+        if provider == 'ptc':
+            return AsyncAuthPtc()
+        elif provider == 'google':
+            return AsyncAuthGoogle()
+        else:
+            raise AuthException("Invalid authentication provider - only ptc/google available.")
+
+    async def login(self, provider, username, password, lat = None, lng = None, alt = None, app_simulation = True, deadline = None):
+
+        deadline = Deadline.from_value(deadline)
+        self._prepare_login(provider, username, password, lat, lng, alt)
+
+        if self._restore_credentials(provider, username, password):
+            return True
+
+        if not self._auth_provider.is_login() and not await self._auth_provider.login(username, password, deadline = deadline):
+            self.log.info('Login process failed')
+            return False
+
+        request = self._create_login_request(app_simulation)
+        response = await request.call(response_format = RESPONSE_FORMAT_PROTOBUF, deadline = deadline)
+
+        return self._finish_login(response, app_simulation)
+
+    async def refresh_ticket(self, deadline = None):
+        """ Coroutine version of PGoApi.refresh_ticket() """
+        if self._auth_provider is None or not self._auth_provider.is_login():
+            return False
+
+        request = AsyncPGoApiRequest(self._api_endpoint, _TokenAuth(self._auth_provider), self._position_lat, self._position_lng, self._position_alt, self._transport, RESPONSE_FORMAT_DICT, self._rpc_hooks, self._rate_limiter)
+        request.get_player()
+        return bool(await request.call(deadline = deadline))
+
+    async def query_map(self, lat = None, lng = None, cell_ids = None, radius = 500, **kwargs):
+        """ Coroutine version of PGoApi.query_map() """
+        request = self._create_map_request(lat, lng, cell_ids, radius)
+        response = await request.call(**kwargs)
+
+        if response:
+            self._cell_timestamps.update(response)
+        return response
+
+    async def close(self):
+        await self._transport.close()
+
+
+class AsyncPGoApiRequest(PGoApiRequest):
+
+    async def call(self, response_format = None, retry_policy = None, deadline = None):
+        if not self._check_call():
+            return NotLoggedInException()
+
+        deadline = Deadline.from_value(deadline)
+        request = AsyncRpcApi(self._auth_provider, self._transport, response_format or self._response_format, self._rpc_hooks)
+        retry = RetryState(retry_policy or self._retry_policy, deadline)
+
+        while True:
+            if self._rate_limiter is not None:
+                delay = self._rate_limiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            self.log.info('Execution of RPC')
+            response = error = None
+            token = self._auth_provider.get_token()
+            try:
+                response = await request.request(self._api_endpoint, self._req_method_list, self.get_position(), deadline)
+            except (ServerBusyOrOfflineException, ServerSideRequestThrottlingException, NotLoggedInException) as e:
+                error = e
+            self._rate_limiter_feedback(error or response)
+
+            kind = get_retry_kind(error, response, request.get_http_status())
+            delay = retry.next_delay(kind)
+            if delay is None:
+                break
+
+            if kind == RETRY_AUTH and not await self._auth_provider.relogin(deadline = deadline, failed_token = token):
+                self.log.info('Re-login failed - giving up')
+                break
+
+            self.log.info('RPC failed (%s) - attempt %s in %.2fs', kind, retry.get_attempts(), delay)
+            await asyncio.sleep(delay)
+
+        if error is not None and retry.is_deadline_exceeded():
+            raise DeadlineExceededException('Deadline exceeded after %s attempts' % retry.get_attempts())
+        elif isinstance(error, ServerBusyOrOfflineException):
+            self.log.info('Server seems to be busy or offline - try again!')
+        elif error is not None:
+            raise error
+
+        # cleanup after call execution
+        self.log.info('Cleanup of request!')
+        self._req_method_list = []
+
+        return response
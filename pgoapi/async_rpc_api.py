@@ -0,0 +1,73 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+from pgoapi.rpc_api import RpcApi
+from pgoapi.rpc_stats import timer
+from pgoapi.exceptions import NotLoggedInException, ServerBusyOrOfflineException
+
+
+class AsyncRpcApi(RpcApi):
+    """ RpcApi running its network round trip on an AsyncHttpTransport """
+
+    async def request(self, endpoint, subrequests, player_position, deadline = None):
+
+        if not self._auth_provider or self._auth_provider.is_login() is False:
+            raise NotLoggedInException()
+
+        stats = self._create_stats(endpoint, subrequests)
+        try:
+            request_proto = self._get_main_request(subrequests, player_position, stats)
+            response = await self._make_rpc(endpoint, request_proto, stats, deadline)
+
+            return self._process_main_response(response, subrequests, stats)
+        except Exception as e:
+            stats.error = e
+            raise
+        finally:
+            self._call_rpc_hooks(stats)
+
+    async def _make_rpc(self, endpoint, request_proto_plain, stats = None, deadline = None):
+        self.log.debug('Execution of RPC')
+
+        timeout = None
+        if deadline is not None:
+            timeout = deadline.get_timeout(self._transport.get_timeout())
+
+        start = timer()
+        request_proto_serialized = request_proto_plain.SerializeToString()
+        serialized = timer()
+        try:
+            http_response = await self._transport.post(endpoint, request_proto_serialized, timeout=timeout)
+        except self._transport.connection_errors as e:
+            raise ServerBusyOrOfflineException
+        finally:
+            if stats is not None:
+                stats.serialize_ms = (serialized - start) * 1000
+                stats.network_ms = (timer() - serialized) * 1000
+                stats.request_bytes = len(request_proto_serialized)
+
+        return http_response
@@ -0,0 +1,139 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import asyncio
+import logging
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from pgoapi.transport import DEFAULT_TIMEOUT
+
+
+class HttpResponse:
+    """ Minimal transport independent HTTP response (status_code, content, headers) """
+
+    def __init__(self, status_code, content, headers = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class AsyncHttpTransport:
+    """
+    Interface of the asyncio HTTP transports used by AsyncPGoApi.
+
+    Implementations have to return a HttpResponse from request() and raise
+    one of the exceptions listed in connection_errors if the remote end
+    could not be reached. timeout is a (connect, read) tuple in seconds; None
+    falls back to the transport default.
+    """
+
+    connection_errors = (OSError, asyncio.TimeoutError)
+
+    async def request(self, method, url, data = None, headers = None, allow_redirects = True, timeout = None):
+        raise NotImplementedError()
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, data, **kwargs):
+        return await self.request('POST', url, data=data, **kwargs)
+
+    async def close(self):
+        pass
+
+
+class AiohttpTransport(AsyncHttpTransport):
+    """
+    aiohttp based keep-alive transport.
+
+    :param limit: maximum number of simultaneous connections
+    :param limit_per_host: maximum number of simultaneous connections per host
+    :param idle_timeout: seconds an idle keep-alive connection is kept open
+    :param headers: default headers sent with every request
+    :param cookies: keep cookies between requests (needed for the PTC login flow)
+    :param timeout: default (connect, read) timeout in seconds for every request
+    """
+
+    if aiohttp is not None:
+        connection_errors = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+    def __init__(self, limit = 100, limit_per_host = 0, idle_timeout = 60, headers = None, cookies = False,
+                 timeout = DEFAULT_TIMEOUT):
+        if aiohttp is None:
+            raise ImportError('AiohttpTransport requires the aiohttp package')
+
+        self.log = logging.getLogger(__name__)
+
+        self._limit = limit
+        self._limit_per_host = limit_per_host
+        self._idle_timeout = idle_timeout
+        self._headers = headers if headers is not None else {'User-Agent': 'Niantic App'}
+        self._cookies = cookies
+        self._timeout = timeout
+
+        self._session = None
+
+    def _get_session(self):
+        # aiohttp sessions have to be created inside a running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._limit, limit_per_host=self._limit_per_host,
+                keepalive_timeout=self._idle_timeout)
+            cookie_jar = None if self._cookies else aiohttp.DummyCookieJar()
+            self._session = aiohttp.ClientSession(connector=connector, headers=self._headers, cookie_jar=cookie_jar)
+        return self._session
+
+    def get_timeout(self):
+        return self._timeout
+
+    def set_timeout(self, timeout):
+        self._timeout = timeout
+
+    def _get_client_timeout(self, timeout):
+        if timeout is None:
+            timeout = self._timeout
+        if timeout is None:
+            return aiohttp.ClientTimeout(total=None)
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=timeout)
+
+    async def request(self, method, url, data = None, headers = None, allow_redirects = True, timeout = None):
+        session = self._get_session()
+        async with session.request(method, url, data=data, headers=headers, allow_redirects=allow_redirects,
+                                   timeout=self._get_client_timeout(timeout)) as response:
+            content = await response.read()
+            return HttpResponse(response.status, content, dict(response.headers))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
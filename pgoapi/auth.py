@@ -26,6 +26,9 @@ Author: tjado <https://github.com/tejado>
 from __future__ import absolute_import
 
 import logging
+import threading
+
+from pgoapi.transport import DEFAULT_TIMEOUT
 from pgoapi.utilities import get_time_ms, get_format_time_diff
 
 class Auth:
@@ -37,11 +40,18 @@ class Auth:
 
         self._login = False
         self._auth_token = None
+        self._token_expiry = None
+        self._username = None
+        self._password = None
+        self._timeout = DEFAULT_TIMEOUT
 
         self._ticket_expire = None
         self._ticket_start = None
         self._ticket_end = None
 
+        self._ticket_listeners = []
+        self._relogin_lock = threading.Lock()
+
     def get_name(self):
         return self._auth_provider
 
@@ -51,15 +61,76 @@ class Auth:
     def get_token(self):
         return self._auth_token
 
+    def get_token_expiry(self):
+        """ Expiry of the access token in unix seconds, None if unknown """
+        return self._token_expiry
+
+    def refresh_token(self, deadline = None):
+        """
+        Fetches a new access token with the credentials of the last login.
+        Unlike relogin() the current token and ticket stay usable until the
+        new token replaces them.
+        """
+        if self._username is None or self._password is None:
+            return False
+
+        fresh = self.__class__()
+        fresh.set_timeout(self._timeout)
+        if not fresh.login(self._username, self._password, deadline = deadline):
+            return False
+
+        self._auth_token, self._token_expiry = fresh.get_token(), fresh.get_token_expiry()
+        return True
+
+    def restore_login(self, username, password, token, token_expiry):
+        """ Resumes a login with a cached access token, without contacting the auth server """
+        self._username = username
+        self._password = password
+        self._auth_token = token
+        self._token_expiry = token_expiry
+        self._login = True
+
+    def get_username(self):
+        return self._username
+
+    def get_timeout(self):
+        return self._timeout
+
+    def set_timeout(self, timeout):
+        """ (connect, read) timeout in seconds of every single login step """
+        self._timeout = timeout
+
+    def _get_timeout(self, deadline = None):
+        if deadline is None:
+            return self._timeout
+        return deadline.get_timeout(self._timeout)
+
     def has_ticket(self):
         if self._ticket_expire and self._ticket_start and self._ticket_end:
             return True
         else:
             return False
 
+    def get_ticket_expire(self):
+        """ Expiry of the current auth ticket in unix milliseconds, None without ticket """
+        return self._ticket_expire
+
     def set_ticket(self, params):
         self._ticket_expire, self._ticket_start, self._ticket_end = params
 
+        for listener in self._ticket_listeners:
+            listener(self)
+
+    def add_ticket_listener(self, listener):
+        """ Registers a callable which is called with this Auth object whenever a new ticket is set """
+        self._ticket_listeners.append(listener)
+
+    def remove_ticket_listener(self, listener):
+        self._ticket_listeners.remove(listener)
+
+    def clear_ticket(self):
+        self._ticket_expire, self._ticket_start, self._ticket_end = (None, None, None)
+
     def is_new_ticket(self, new_ticket_time_ms):
         if self._ticket_expire is None or new_ticket_time_ms > self._ticket_expire:
             return True
@@ -75,7 +146,7 @@ class Auth:
                 return True
             else:
                 self.log.debug('Removed expired auth ticket (%s < %s)', now_ms, self._ticket_expire)
-                self._ticket_expire, self._ticket_start, self._ticket_end = (None, None, None)
+                self.clear_ticket()
                 return False
         else:
             return False
@@ -86,5 +157,35 @@ class Auth:
         else:
             return False
 
-    def login(self, username, password):
-        raise NotImplementedError()
\ No newline at end of file
+    def login(self, username, password, deadline = None):
+        raise NotImplementedError()
+
+    def relogin(self, deadline = None, failed_token = None):
+        """
+        Logs in again with the credentials of the last login, dropping the
+        current auth ticket. Like refresh_token() the login runs on a new
+        provider, so no session or cookies of the last login are reused.
+
+        Concurrent re-logins are serialized. With failed_token - the access
+        token the failed request was sent with - a caller finding that
+        another request already replaced this token reuses the new one.
+        """
+        if self._username is None or self._password is None:
+            return False
+
+        with self._relogin_lock:
+            if failed_token is not None and self._auth_token != failed_token:
+                self.log.debug('Re-login for %s already done', self._username)
+                return True
+
+            self.log.info('Re-login for: %s', self._username)
+            self.clear_ticket()
+
+            fresh = self.__class__()
+            fresh.set_timeout(self._timeout)
+            if not fresh.login(self._username, self._password, deadline = deadline):
+                return False
+
+            self._auth_token, self._token_expiry = fresh.get_token(), fresh.get_token_expiry()
+            self._login = True
+            return True
@@ -42,14 +42,23 @@ class AuthGoogle(Auth):
         
         self._auth_provider = 'google'
 
-    def login(self, username, password):
+    def login(self, username, password, deadline = None):
         self.log.info('Google login for: {}'.format(username))
+        self._username = username
+        self._password = password
+
+        # gpsoauth has no timeout support, so the deadline can only be checked between its steps
+        if deadline is not None:
+            deadline.check()
         login = perform_master_login(username, password, self.GOOGLE_LOGIN_ANDROID_ID)
+        if deadline is not None:
+            deadline.check()
         login = perform_oauth(username, login.get('Token', ''), self.GOOGLE_LOGIN_ANDROID_ID, self.GOOGLE_LOGIN_SERVICE, self.GOOGLE_LOGIN_APP,
             self.GOOGLE_LOGIN_CLIENT_SIG)
             
         self._auth_token = login.get('Auth')
-        
+        self._token_expiry = int(login['Expiry']) if 'Expiry' in login else None
+
         if self._auth_token is None:
             self.log.info('Google Login failed.')
             return False
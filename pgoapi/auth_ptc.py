@@ -27,10 +27,12 @@ from __future__ import absolute_import
 
 import re
 import json
+import time
 import logging
 import requests
 
 from pgoapi.auth import Auth
+from pgoapi.exceptions import DeadlineExceededException
 
 class AuthPtc(Auth):
 
@@ -46,15 +48,46 @@ class AuthPtc(Auth):
         self._session = requests.session()
         self._session.verify = True
 
-    def login(self, username, password):
+    def login(self, username, password, deadline = None):
 
         self.log.info('Login for: %s', username)
-        
+        self._username = username
+        self._password = password
+
         head = {'User-Agent': 'niantic'}
-        r = self._session.get(self.PTC_LOGIN_URL, headers=head)
+        r = self._request('GET', self.PTC_LOGIN_URL, deadline, headers=head)
+
+        data = self._get_login_form(r.content, username, password)
+        if not data:
+            return False
+
+        r1 = self._request('POST', self.PTC_LOGIN_URL, deadline, data=data, headers=head)
+
+        ticket = None
+        try:
+            ticket = re.sub('.*ticket=', '', r1.history[0].headers['Location'])
+        except Exception as e:
+            try:
+                self.log.error('Could not retrieve token: %s', r1.json()['errors'][0])
+            except Exception as e:
+                self.log.error('Could not retrieve token! (%s)', str(e))
+            return False
+
+        r2 = self._request('POST', self.PTC_LOGIN_OAUTH, deadline, data=self._get_oauth_form(ticket))
+
+        return self._set_access_token(r2.content)
 
+    def _request(self, method, url, deadline = None, **kwargs):
         try:
-            jdata = json.loads(r.content.decode('utf-8'))
+            return self._session.request(method, url, timeout=self._get_timeout(deadline), **kwargs)
+        except requests.exceptions.Timeout:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceededException('Deadline exceeded during PTC login')
+            raise
+
+    def _get_login_form(self, content, username, password):
+        try:
+            jdata = json.loads(content.decode('utf-8'))
             data = {
                 'lt': jdata['lt'],
                 'execution': jdata['execution'],
@@ -64,34 +97,30 @@ class AuthPtc(Auth):
             }
         except ValueError as e:
             self.log.error('Field missing in response: %s' % e)
-            return False
+            return None
         except KeyError as e:
             self.log.error('Field missing in response.content: %s' % e)
-            return False
-        r1 = self._session.post(self.PTC_LOGIN_URL, data=data, headers=head)
+            return None
 
-        ticket = None
-        try:
-            ticket = re.sub('.*ticket=', '', r1.history[0].headers['Location'])
-        except Exception as e:
-            try:
-                self.log.error('Could not retrieve token: %s', r1.json()['errors'][0])
-            except Exception as e:
-                self.log.error('Could not retrieve token! (%s)', str(e))
-            return False
+        return data
 
-        data1 = {
+    def _get_oauth_form(self, ticket):
+        return {
             'client_id': 'mobile-app_pokemon-go',
             'redirect_uri': 'https://www.nianticlabs.com/pokemongo/error',
             'client_secret': self.PTC_LOGIN_CLIENT_SECRET,
             'grant_type': 'refresh_token',
             'code': ticket,
         }
-        
-        r2 = self._session.post(self.PTC_LOGIN_OAUTH, data=data1)
-        access_token = re.sub('&expires.*', '', r2.content.decode('utf-8'))
+
+    def _set_access_token(self, content):
+        content = content.decode('utf-8')
+        access_token = re.sub('&expires.*', '', content)
         access_token = re.sub('.*access_token=', '', access_token)
 
+        expires = re.search('expires=(\\d+)', content)
+        self._token_expiry = time.time() + int(expires.group(1)) if expires else None
+
         if '-sso.pokemon.com' in access_token:
             self.log.info('PTC Login successful')
             self.log.debug('PTC Session Token: %s', access_token[:25])
@@ -103,4 +132,3 @@ class AuthPtc(Auth):
         self._login = True
         
         return True
-        
@@ -0,0 +1,208 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+from six.moves import queue
+
+
+class AuthRefresher:
+    """
+    Background refresher of auth tickets and access tokens.
+
+    Accounts added to the refresher get a new access token `token_margin`
+    seconds before the current one expires and a new auth ticket
+    `ticket_margin` seconds before the ticket (expire_timestamp_ms of the last
+    RPC response) expires. The old token and ticket stay in use until the
+    new ones replace them, so requests in flight never wait for a login.
+
+    Refreshes run on `workers` daemon threads, scheduling happens on one more
+    thread which wakes up at the next due refresh, but at least every
+    `interval` seconds to pick up tickets received in the meantime.
+
+    Works with PGoApi instances; AsyncPGoApi is not supported.
+
+    :param ticket_margin: seconds before ticket expiry a new ticket is requested
+    :param token_margin: seconds before token expiry a new token is fetched
+    :param interval: maximum seconds between two scheduling rounds
+    :param retry_delay: seconds before a failed refresh is tried again
+    :param workers: number of refresh threads
+    """
+
+    def __init__(self, ticket_margin = 300, token_margin = 600, interval = 30, retry_delay = 60, workers = 4):
+
+        self.log = logging.getLogger(__name__)
+
+        self._ticket_margin = ticket_margin
+        self._token_margin = token_margin
+        self._interval = interval
+        self._retry_delay = retry_delay
+        self._workers = workers
+
+        self._apis = []
+        self._pending = set()
+        self._backoff = {}
+        self._queue = queue.Queue()
+
+        self._condition = threading.Condition()
+        self._threads = []
+        self._running = False
+
+        self._refreshed_tokens = 0
+        self._refreshed_tickets = 0
+        self._failures = 0
+
+    def add(self, api):
+        with self._condition:
+            if api not in self._apis:
+                self._apis.append(api)
+            self._condition.notify()
+
+    def remove(self, api):
+        with self._condition:
+            if api in self._apis:
+                self._apis.remove(api)
+            self._backoff.pop(id(api), None)
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+
+        self._threads = [threading.Thread(target=self._schedule, name='AuthRefresher')]
+        for i in range(self._workers):
+            self._threads.append(threading.Thread(target=self._work, name='AuthRefresher-{}'.format(i)))
+
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+        for thread in self._threads[1:]:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def get_stats(self):
+        return {
+            'accounts': len(self._apis),
+            'pending': len(self._pending),
+            'refreshed_tokens': self._refreshed_tokens,
+            'refreshed_tickets': self._refreshed_tickets,
+            'failures': self._failures,
+        }
+
+    def get_due(self, api):
+        """ Unix time the next refresh of an account is due, None if nothing can be refreshed """
+        auth_provider = api.get_auth_provider()
+        if auth_provider is None or not auth_provider.is_login():
+            return None
+
+        due = []
+
+        token_expiry = auth_provider.get_token_expiry()
+        if token_expiry is not None:
+            due.append(token_expiry - self._token_margin)
+
+        ticket_expire = auth_provider.get_ticket_expire()
+        if ticket_expire is not None:
+            due.append(ticket_expire / 1000.0 - self._ticket_margin)
+
+        if not due:
+            return None
+        return max(min(due), self._backoff.get(id(api), 0))
+
+    def refresh(self, api):
+        """ Refreshes the token and/or ticket of an account if due, returns False if a refresh failed """
+        auth_provider = api.get_auth_provider()
+        now = time.time()
+
+        token_expiry = auth_provider.get_token_expiry()
+        if token_expiry is not None and token_expiry - self._token_margin <= now:
+            self.log.info('Refreshing access token of %s', auth_provider.get_username())
+            if not auth_provider.refresh_token():
+                return False
+            self._refreshed_tokens += 1
+
+        ticket_expire = auth_provider.get_ticket_expire()
+        if ticket_expire is not None and ticket_expire / 1000.0 - self._ticket_margin <= now:
+            self.log.info('Refreshing auth ticket of %s', auth_provider.get_username())
+            if not api.refresh_ticket() or auth_provider.get_ticket_expire() == ticket_expire:
+                return False
+            self._refreshed_tickets += 1
+
+        return True
+
+    def _schedule(self):
+        with self._condition:
+            while self._running:
+                now = time.time()
+                wait = self._interval
+
+                for api in self._apis:
+                    if id(api) in self._pending:
+                        continue
+
+                    due = self.get_due(api)
+                    if due is None:
+                        continue
+                    elif due <= now:
+                        self._pending.add(id(api))
+                        self._queue.put(api)
+                    else:
+                        wait = min(wait, due - now)
+
+                self._condition.wait(wait)
+
+    def _work(self):
+        while True:
+            api = self._queue.get()
+            if api is None:
+                return
+
+            try:
+                success = self.refresh(api)
+            except Exception as e:
+                self.log.warning('Auth refresh failed: %s', e)
+                success = False
+
+            with self._condition:
+                self._pending.discard(id(api))
+                if success:
+                    self._backoff.pop(id(api), None)
+                else:
+                    self._failures += 1
+                    self._backoff[id(api)] = time.time() + self._retry_delay
+                self._condition.notify()
@@ -0,0 +1,156 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+from pgoapi.pgoapi import PGoApi
+
+
+class LoginResult:
+    """ Outcome of one login of a BulkLogin run """
+
+    def __init__(self, provider, username, api = None, success = False, error = None, started = None, duration = None):
+        self.provider = provider
+        self.username = username
+        self.api = api
+        self.success = success
+        self.error = error
+        self.started = started
+        self.duration = duration
+
+    def __repr__(self):
+        return '<LoginResult {}/{} success={} duration={:.2f}s error={!r}>'.format(
+            self.provider, self.username, self.success, self.duration or 0.0, self.error)
+
+
+class BulkLogin:
+    """
+    Logs in many accounts in parallel.
+
+    Logins run on up to `concurrency` threads. The threads are started
+    `stagger` seconds apart, so the auth servers see a ramp instead of a
+    burst. `provider_limits` caps the concurrent logins per provider (e.g.
+    {'google': 2}); a thread skips accounts of a provider at its limit and
+    logs in the next account of another provider instead.
+
+        results = BulkLogin(concurrency=16).login(accounts, app_simulation=False)
+        apis = [r.api for r in results if r.success]
+
+    :param create_api: factory returning the PGoApi used for one account, e.g.
+       to set a credential store or rate limiter (default: PGoApi)
+    :param concurrency: maximum number of logins at the same time
+    :param stagger: seconds between the start of two login threads
+    :param provider_limits: {provider: maximum concurrent logins}
+    """
+
+    def __init__(self, create_api = None, concurrency = 8, stagger = 0.5, provider_limits = None):
+
+        self.log = logging.getLogger(__name__)
+
+        self._create_api = create_api or PGoApi
+        self._concurrency = concurrency
+        self._stagger = stagger
+        self._provider_limits = dict(provider_limits or {})
+
+        if concurrency < 1:
+            raise ValueError('Invalid login concurrency {} - has to be at least 1.'.format(concurrency))
+
+        for provider, limit in self._provider_limits.items():
+            if limit < 1:
+                raise ValueError("Invalid login limit {} for provider '{}' - has to be at least 1.".format(limit, provider))
+
+    def login(self, accounts, **kwargs):
+        """
+        :param accounts: iterable of dicts with provider, username, password
+           and optionally lat, lng and alt
+        :param kwargs: passed to every PGoApi.login() call
+        :return: list of LoginResult in the order of accounts
+        """
+        pending = list(enumerate(accounts))
+        results = [None] * len(pending)
+        active = {}
+        condition = threading.Condition()
+
+        def next_account():
+            with condition:
+                while pending:
+                    for i, (index, account) in enumerate(pending):
+                        provider = account['provider']
+                        limit = self._provider_limits.get(provider)
+                        if limit is None or active.get(provider, 0) < limit:
+                            del pending[i]
+                            active[provider] = active.get(provider, 0) + 1
+                            return index, account
+                    condition.wait()
+                return None
+
+        def worker(delay):
+            time.sleep(delay)
+            while True:
+                task = next_account()
+                if task is None:
+                    return
+
+                index, account = task
+                try:
+                    results[index] = self._login(account, kwargs)
+                finally:
+                    with condition:
+                        active[account['provider']] -= 1
+                        condition.notify_all()
+
+        started = time.time()
+        threads = [threading.Thread(target=worker, args=(i * self._stagger,), name='BulkLogin-{}'.format(i))
+                   for i in range(min(self._concurrency, len(pending)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        succeeded = sum(1 for result in results if result.success)
+        self.log.info('Logged in %s/%s accounts in %.1fs', succeeded, len(results), time.time() - started)
+
+        return results
+
+    def _login(self, account, kwargs):
+        provider, username = account['provider'], account['username']
+        result = LoginResult(provider, username, started=time.time())
+
+        try:
+            api = self._create_api()
+            result.success = bool(api.login(provider, username, account['password'],
+                                            account.get('lat'), account.get('lng'), account.get('alt'), **kwargs))
+            result.api = api
+        except Exception as e:
+            self.log.warning('Login of %s/%s failed: %s', provider, username, e)
+            result.error = e
+
+        result.duration = time.time() - result.started
+        return result
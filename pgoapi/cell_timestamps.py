@@ -0,0 +1,94 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+
+from pgoapi.utilities import LRUCache, get_map_cells
+
+
+class CellTimestampCache:
+    """
+    Last current_timestamp_ms of every S2 cell seen in a GET_MAP_OBJECTS
+    response, sent back as since_timestamp_ms so the server only returns
+    what changed in a cell since then.
+
+    Incremental responses only contain changes - the caller has to keep the
+    cell contents of earlier responses (e.g. in a MapState). Cells are kept
+    in a LRU of max_cells entries, an evicted cell is requested in full again.
+    Truncated cells (is_truncated_list) are not recorded.
+
+    :param max_cells: maximum number of cells remembered
+    :param on_evict: optional callable(cell_id, timestamp_ms) called for evicted cells
+    """
+
+    def __init__(self, max_cells = 20000, on_evict = None):
+
+        self.log = logging.getLogger(__name__)
+
+        self._cells = LRUCache(max_cells, on_evict)
+
+    def get_timestamp(self, cell_id):
+        return self._cells.get(cell_id, 0)
+
+    def get_timestamps(self, cell_ids):
+        """ since_timestamp_ms values for cell_ids, 0 for unknown cells """
+        return [self._cells.get(cell_id, 0) for cell_id in cell_ids]
+
+    def set_timestamp(self, cell_id, timestamp_ms):
+        self._cells.set(cell_id, timestamp_ms)
+
+    def forget(self, cell_id):
+        self._cells.pop(cell_id)
+
+    def clear(self):
+        self._cells.clear()
+
+    def __len__(self):
+        return len(self._cells)
+
+    def update(self, response):
+        """
+        Records the cell timestamps of a response (dict or protobuf format)
+        containing GET_MAP_OBJECTS, returns the number of recorded cells.
+        """
+        cells = get_map_cells(response)
+        if cells is None:
+            return 0
+
+        count = 0
+        for cell in cells:
+            if isinstance(cell, dict):
+                cell_id, timestamp_ms, truncated = cell['s2_cell_id'], cell.get('current_timestamp_ms'), cell.get('is_truncated_list')
+            else:
+                cell_id, timestamp_ms, truncated = cell.s2_cell_id, cell.current_timestamp_ms, cell.is_truncated_list
+
+            if timestamp_ms and not truncated:
+                self._cells.set(cell_id, timestamp_ms)
+                count += 1
+
+        self.log.debug('Recorded timestamps of %s map cells', count)
+        return count
@@ -0,0 +1,115 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import os
+import json
+import base64
+import hashlib
+import logging
+import threading
+
+from pgoapi.utilities import write_file_atomic
+
+class CredentialStore:
+    """
+    On-disk cache of login state, keyed by auth provider and username.
+
+    Every account is kept in its own JSON file inside `directory`, so several
+    worker processes can share one directory without overwriting each other.
+    An entry holds the access token and its expiry (unix seconds), the auth
+    ticket as (expire_timestamp_ms, start, end) and the resolved API endpoint.
+
+    The files contain valid session tokens and are created readable by the
+    owner only.
+    """
+
+    def __init__(self, directory):
+
+        self.log = logging.getLogger(__name__)
+
+        self._directory = directory
+        self._lock = threading.Lock()
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def get_directory(self):
+        return self._directory
+
+    def _get_path(self, provider, username):
+        key = hashlib.sha1(username.encode('utf-8')).hexdigest()
+        return os.path.join(self._directory, '{}_{}.json'.format(provider, key))
+
+    def load(self, provider, username):
+        """ Returns the cached credentials of an account or None """
+        path = self._get_path(provider, username)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError):
+            return None
+        except ValueError as e:
+            self.log.warning('Ignoring corrupt credential cache %s: %s', path, e)
+            return None
+
+        if data.get('username') != username:
+            return None
+
+        ticket = data.get('ticket')
+        if ticket:
+            expire, start, end = ticket
+            data['ticket'] = (expire, base64.b64decode(start), base64.b64decode(end))
+        return data
+
+    def save(self, provider, username, credentials):
+        """
+        Stores credentials ({'token', 'token_expiry', 'ticket', 'api_endpoint'})
+        of an account. Failures are logged, a broken cache never fails a login.
+        """
+        data = dict(credentials, provider=provider, username=username)
+
+        ticket = data.get('ticket')
+        if ticket:
+            expire, start, end = ticket
+            data['ticket'] = (expire, base64.b64encode(start).decode('ascii'), base64.b64encode(end).decode('ascii'))
+
+        path = self._get_path(provider, username)
+        with self._lock:
+            try:
+                write_file_atomic(path, json.dumps(data).encode('utf-8'))
+            except (IOError, OSError) as e:
+                self.log.warning('Could not write credential cache %s: %s', path, e)
+                return False
+
+        self.log.debug('Cached credentials of %s/%s', provider, username)
+        return True
+
+    def delete(self, provider, username):
+        try:
+            os.remove(self._get_path(provider, username))
+        except (IOError, OSError):
+            pass
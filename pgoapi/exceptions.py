@@ -42,4 +42,10 @@ class EmptySubrequestChainException(Exception):
     pass
     
 class ServerSideRequestThrottlingException(Exception):
+    pass
+
+class DeadlineExceededException(Exception):
+    pass
+
+class NoAvailableAccountException(Exception):
     pass
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import heapq
+import logging
+import threading
+
+EVICT_EXPIRED = 'expired'
+EVICT_CAPACITY = 'capacity'
+
+# WildPokemon.time_till_hidden_ms outside of (0, 1h] is not a usable lifetime
+MAX_TIME_TILL_HIDDEN_MS = 3600000
+
+
+def _get(obj, field, default = None):
+    if isinstance(obj, dict):
+        return obj.get(field, default)
+    return getattr(obj, field, default)
+
+
+def get_expiration_time(obj, now = None):
+    """
+    Unix time in seconds a map object disappears: expiration_timestamp_ms of
+    MapPokemon, time_till_hidden_ms of WildPokemon (relative to now) or the
+    lure expiry of a FortData. None if the object has no known lifetime.
+    """
+    expiration_timestamp_ms = _get(obj, 'expiration_timestamp_ms')
+    if expiration_timestamp_ms:
+        return expiration_timestamp_ms / 1000.0
+
+    time_till_hidden_ms = _get(obj, 'time_till_hidden_ms')
+    if time_till_hidden_ms is not None and 0 < time_till_hidden_ms <= MAX_TIME_TILL_HIDDEN_MS:
+        return (now if now is not None else time.time()) + time_till_hidden_ms / 1000.0
+
+    lure_info = _get(obj, 'lure_info')
+    if lure_info:
+        lure_expires_timestamp_ms = _get(lure_info, 'lure_expires_timestamp_ms')
+        if lure_expires_timestamp_ms:
+            return lure_expires_timestamp_ms / 1000.0
+
+    return None
+
+
+class ExpiryStore:
+    """
+    Store of transient objects which are evicted when they expire.
+
+    A heap ordered by expiry time makes adding and evicting O(log n); an
+    updated or removed object leaves its old heap entry behind, which is
+    skipped and dropped once the heap holds twice as many entries as objects. expire()
+    evicts everything expired until now and is called by every add(). With
+    max_items, adding to a full store evicts the objects expiring next.
+    Evicted objects are passed to on_evict(key, obj, reason).
+
+    :param max_items: memory ceiling in number of objects, None for no limit
+    :param on_evict: optional callable(key, obj, EVICT_EXPIRED/EVICT_CAPACITY)
+    """
+
+    def __init__(self, max_items = None, on_evict = None):
+
+        self.log = logging.getLogger(__name__)
+
+        self._max_items = max_items
+        self._on_evict = on_evict
+
+        self._lock = threading.Lock()
+        self._heap = []
+        self._items = {}
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def add(self, key, obj, expires_at):
+        """ Adds or replaces an object expiring at unix time expires_at """
+        with self._lock:
+            self._counter += 1
+            self._items[key] = (expires_at, self._counter, obj)
+            heapq.heappush(self._heap, (expires_at, self._counter, key))
+            self._check_compact()
+
+        evicted = self._expire(time.time())
+        if self._max_items is not None:
+            evicted.extend(self._evict_capacity())
+        self._notify(evicted)
+
+    def add_object(self, key, obj, now = None):
+        """ Adds a map object with its lifetime from get_expiration_time(), returns False if it has none """
+        expires_at = get_expiration_time(obj, now)
+        if expires_at is None:
+            return False
+
+        self.add(key, obj, expires_at)
+        return True
+
+    def get(self, key, default = None):
+        item = self._items.get(key)
+        if item is None or item[0] <= time.time():
+            return default
+        return item[2]
+
+    def get_expiry(self, key):
+        item = self._items.get(key)
+        return item[0] if item is not None else None
+
+    def remove(self, key):
+        """ Removes an object without eviction callback """
+        with self._lock:
+            item = self._items.pop(key, None)
+            self._check_compact()
+        return item[2] if item is not None else None
+
+    def items(self):
+        now = time.time()
+        with self._lock:
+            return [(key, item[2]) for key, item in self._items.items() if item[0] > now]
+
+    def values(self):
+        return [obj for key, obj in self.items()]
+
+    def expire(self, now = None):
+        """ Evicts all objects expired until now, returns [(key, obj)] """
+        evicted = self._expire(time.time() if now is None else now)
+        self._notify(evicted)
+        return [(key, obj) for key, obj, reason in evicted]
+
+    def _expire(self, now):
+        evicted = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                item = self._pop_current(entry)
+                if item is not None:
+                    evicted.append((entry[2], item[2], EVICT_EXPIRED))
+        return evicted
+
+    def _evict_capacity(self):
+        evicted = []
+        with self._lock:
+            while len(self._items) > self._max_items and self._heap:
+                entry = heapq.heappop(self._heap)
+                item = self._pop_current(entry)
+                if item is not None:
+                    evicted.append((entry[2], item[2], EVICT_CAPACITY))
+        return evicted
+
+    def _pop_current(self, entry):
+        """ Removes the object of a heap entry unless the entry is outdated """
+        expires_at, counter, key = entry
+        item = self._items.get(key)
+        if item is None or item[1] != counter:
+            return None
+        return self._items.pop(key)
+
+    def _check_compact(self):
+        if len(self._heap) > 2 * len(self._items) + 64:
+            self._compact()
+
+    def _compact(self):
+        self._heap = [(expires_at, counter, key) for key, (expires_at, counter, obj) in self._items.items()]
+        heapq.heapify(self._heap)
+
+    def _notify(self, evicted):
+        if not evicted:
+            return
+
+        self.log.debug('Evicted %s objects', len(evicted))
+        if self._on_evict is not None:
+            for key, obj, reason in evicted:
+                self._on_evict(key, obj, reason)
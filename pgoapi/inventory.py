@@ -0,0 +1,250 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import six
+import logging
+import threading
+
+from pgoapi.rpc_api import RESPONSE_FORMAT_PROTOBUF
+
+from . import protos
+from POGOProtos.Data_pb2 import PokemonData, PokedexEntry
+from POGOProtos.Inventory_pb2 import Candy, EggIncubator
+
+
+class Inventory:
+    """
+    Incrementally updated inventory of one account.
+
+    The first refresh() downloads the whole inventory, every further one
+    sends the new_timestamp_ms of the last InventoryDelta as
+    last_timestamp_ms and only receives the items changed since then.
+    Added, modified and deleted items are merged into indexed collections:
+    pokemon and eggs by id, pokemon by species and - with an
+    ItemTemplateStore to look up families - by family, item counts by item
+    id, candies by family id, egg incubators by id and pokedex entries by
+    pokemon id.
+
+        inventory = Inventory(api)
+        inventory.refresh()
+        inventory.get_item_count(1)
+
+    :param api: PGoApi of the account
+    :param item_templates: optional ItemTemplateStore for the family index
+    """
+
+    def __init__(self, api = None, item_templates = None):
+
+        self.log = logging.getLogger(__name__)
+
+        self._api = api
+        self._item_templates = item_templates
+        self._lock = threading.RLock()
+
+        self.clear()
+
+    def clear(self):
+        """ Drops all items, the next refresh() downloads the whole inventory again """
+        with self._lock:
+            self._timestamp_ms = 0
+
+            self._pokemon = {}
+            self._eggs = {}
+            self._species = {}
+            self._families = {}
+            self._pokemon_family = {}
+
+            self._items = {}
+            self._candies = {}
+            self._incubators = {}
+            self._pokedex = {}
+
+            self._player_stats = None
+            self._player_currency = None
+            self._applied_items = None
+            self._inventory_upgrades = None
+
+    def get_timestamp_ms(self):
+        return self._timestamp_ms
+
+    def refresh(self, api = None):
+        """ Requests the changes since the last refresh and merges them, returns False if the request failed """
+        request = (api or self._api).create_request()
+        if self._timestamp_ms:
+            request.get_inventory(last_timestamp_ms=self._timestamp_ms)
+        else:
+            request.get_inventory()
+
+        response = request.call(response_format = RESPONSE_FORMAT_PROTOBUF)
+        if not response:
+            return False
+
+        return self.apply(response['responses']['GET_INVENTORY'])
+
+    def apply(self, response):
+        """ Merges a GetInventoryResponse """
+        if isinstance(response, six.string_types) or not response.success:
+            return False
+
+        delta = response.inventory_delta
+        with self._lock:
+            if not delta.original_timestamp_ms and self._timestamp_ms:
+                # a full inventory replaces everything known so far
+                self.clear()
+
+            for inventory_item in delta.inventory_items:
+                if inventory_item.deleted_item_key:
+                    # deleted_item_key is a signed int64, PokemonData.id an unsigned fixed64
+                    self._delete(inventory_item.deleted_item_key & 0xFFFFFFFFFFFFFFFF)
+                    continue
+
+                for field, value in inventory_item.inventory_item_data.ListFields():
+                    self._merge(field.name, value)
+
+            if delta.new_timestamp_ms:
+                self._timestamp_ms = delta.new_timestamp_ms
+
+        self.log.debug('Merged %s inventory changes (timestamp %s)', len(delta.inventory_items), self._timestamp_ms)
+        return True
+
+    def _merge(self, kind, value):
+        if kind == 'pokemon_data':
+            pokemon = PokemonData()
+            pokemon.CopyFrom(value)
+            self._delete(pokemon.id)
+            if pokemon.is_egg:
+                self._eggs[pokemon.id] = pokemon
+            else:
+                self._add_pokemon(pokemon)
+        elif kind == 'item':
+            self._items[value.item_id] = value.count
+        elif kind == 'candy':
+            candy = Candy()
+            candy.CopyFrom(value)
+            self._candies[candy.family_id] = candy
+        elif kind == 'egg_incubators':
+            self._incubators = {}
+            for value_incubator in value.egg_incubator:
+                incubator = EggIncubator()
+                incubator.CopyFrom(value_incubator)
+                self._incubators[incubator.id] = incubator
+        elif kind == 'pokedex_entry':
+            entry = PokedexEntry()
+            entry.CopyFrom(value)
+            self._pokedex[entry.pokemon_id] = entry
+        elif kind in ('player_stats', 'player_currency', 'applied_items', 'inventory_upgrades'):
+            copy = type(value)()
+            copy.CopyFrom(value)
+            setattr(self, '_' + kind, copy)
+
+    def _add_pokemon(self, pokemon):
+        self._pokemon[pokemon.id] = pokemon
+        self._species.setdefault(pokemon.pokemon_id, set()).add(pokemon.id)
+
+        family_id = self._get_family_id(pokemon.pokemon_id)
+        if family_id is not None:
+            self._families.setdefault(family_id, set()).add(pokemon.id)
+
+    def _delete(self, key):
+        self._eggs.pop(key, None)
+
+        pokemon = self._pokemon.pop(key, None)
+        if pokemon is None:
+            return
+
+        self._species[pokemon.pokemon_id].discard(key)
+        family_id = self._get_family_id(pokemon.pokemon_id)
+        if family_id is not None:
+            self._families[family_id].discard(key)
+
+    def _get_family_id(self, pokemon_id):
+        if self._item_templates is None:
+            return None
+
+        if pokemon_id not in self._pokemon_family:
+            settings = self._item_templates.get_pokemon(pokemon_id)
+            self._pokemon_family[pokemon_id] = settings.family_id if settings is not None else None
+        return self._pokemon_family[pokemon_id]
+
+    def get_pokemon(self, pokemon_id = None):
+        """ PokemonData by id, all pokemon (without eggs) if pokemon_id is None """
+        with self._lock:
+            if pokemon_id is None:
+                return list(self._pokemon.values())
+            return self._pokemon.get(pokemon_id)
+
+    def get_pokemon_by_species(self, pokemon_id):
+        with self._lock:
+            return [self._pokemon[key] for key in self._species.get(pokemon_id, ())]
+
+    def get_pokemon_by_family(self, family_id):
+        """ All pokemon of a family, requires an ItemTemplateStore """
+        if self._item_templates is None:
+            raise ValueError('The family index requires an ItemTemplateStore')
+
+        with self._lock:
+            return [self._pokemon[key] for key in self._families.get(family_id, ())]
+
+    def get_eggs(self):
+        with self._lock:
+            return list(self._eggs.values())
+
+    def get_items(self):
+        """ {item_id: count} """
+        with self._lock:
+            return dict(self._items)
+
+    def get_item_count(self, item_id):
+        return self._items.get(item_id, 0)
+
+    def get_candy(self, family_id):
+        candy = self._candies.get(family_id)
+        return candy.candy if candy is not None else 0
+
+    def get_candies(self):
+        """ {family_id: candy count} """
+        with self._lock:
+            return dict((family_id, candy.candy) for family_id, candy in self._candies.items())
+
+    def get_incubators(self):
+        with self._lock:
+            return list(self._incubators.values())
+
+    def get_pokedex_entry(self, pokemon_id):
+        return self._pokedex.get(pokemon_id)
+
+    def get_player_stats(self):
+        return self._player_stats
+
+    def get_player_currency(self):
+        return self._player_currency
+
+    def get_applied_items(self):
+        return self._applied_items
+
+    def get_inventory_upgrades(self):
+        return self._inventory_upgrades
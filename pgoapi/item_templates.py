@@ -0,0 +1,259 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from pgoapi.raw_decoder import iter_fields, WIRETYPE_VARINT, WIRETYPE_LENGTH_DELIMITED
+from pgoapi.rpc_api import RESPONSE_FORMAT_PROTOBUF
+from pgoapi.utilities import write_file_atomic
+
+from . import protos
+from POGOProtos.Networking.Responses_pb2 import DownloadItemTemplatesResponse
+
+_RESPONSE_FIELDS = DownloadItemTemplatesResponse.DESCRIPTOR.fields_by_name
+_TEMPLATE_FIELDS = _RESPONSE_FIELDS['item_templates'].message_type.fields_by_name
+
+# index name -> (ItemTemplate field, key field inside that settings message)
+INDEXES = {
+    'pokemon': ('pokemon_settings', 'pokemon_id'),
+    'move': ('move_settings', 'movement_id'),
+    'item': ('item_settings', 'item_id'),
+    'type_effective': ('type_effective', 'attack_type'),
+    'badge': ('badge_settings', 'badge_type'),
+}
+
+# ItemTemplate field number -> (index name, key field number)
+_INDEX_FIELDS = dict((_TEMPLATE_FIELDS[field].number, (name, _TEMPLATE_FIELDS[field].message_type.fields_by_name[key].number))
+                     for name, (field, key) in INDEXES.items())
+
+
+class ItemTemplateStore:
+    """
+    Indexed item templates of DOWNLOAD_ITEM_TEMPLATES.
+
+    Only the serialized DownloadItemTemplatesResponse is kept in memory (and
+    on disk if a path is given). Loading it just scans the wire format for
+    the byte offsets of every template, a template is parsed on its first
+    lookup. Lookups by template_id, pokemon id, move id, item id, attack type
+    and badge type are dict lookups.
+
+    sync() only downloads the templates again if the item_templates_timestamp_ms
+    announced by DOWNLOAD_REMOTE_CONFIG_VERSION differs from the stored one.
+    """
+
+    def __init__(self, path = None):
+
+        self.log = logging.getLogger(__name__)
+
+        self._path = path
+        self._lock = threading.Lock()
+
+        self._clear()
+
+        if path is not None:
+            self._load_file()
+
+    def _clear(self):
+        self._raw = bytearray()
+        self._timestamp_ms = None
+        self._offsets = {}
+        self._indexes = dict((name, {}) for name in INDEXES)
+        self._player_level = None
+        self._templates = {}
+
+    def _load_file(self):
+        try:
+            with open(self._path, 'rb') as f:
+                raw = f.read()
+        except (IOError, OSError):
+            return
+
+        try:
+            self._load(raw)
+        except ValueError as e:
+            self.log.warning('Ignoring corrupt item template cache %s: %s', self._path, e)
+            self._clear()
+            return
+
+        self.log.debug('Loaded %s item templates from %s', len(self._offsets), self._path)
+
+    def _load(self, raw):
+        self._clear()
+        data = self._raw = bytearray(raw)
+
+        template_number = _RESPONSE_FIELDS['item_templates'].number
+        timestamp_number = _RESPONSE_FIELDS['timestamp_ms'].number
+        template_id_number = _TEMPLATE_FIELDS['template_id'].number
+        player_level_number = _TEMPLATE_FIELDS['player_level'].number
+
+        for number, wire_type, value in iter_fields(data):
+            if number == timestamp_number and wire_type == WIRETYPE_VARINT:
+                self._timestamp_ms = value
+            elif number == template_number and wire_type == WIRETYPE_LENGTH_DELIMITED:
+                self._index_template(data, value, template_id_number, player_level_number)
+
+    def _index_template(self, data, offsets, template_id_number, player_level_number):
+        template_id = None
+        keys = []
+        for number, wire_type, value in iter_fields(data, *offsets):
+            if wire_type != WIRETYPE_LENGTH_DELIMITED:
+                continue
+
+            if number == template_id_number:
+                template_id = bytes(data[value[0]:value[1]]).decode('utf-8')
+            elif number == player_level_number:
+                keys.append(('player_level', None))
+            elif number in _INDEX_FIELDS:
+                name, key_number = _INDEX_FIELDS[number]
+                # enum/integer keys are 0 if not present on the wire
+                key = 0
+                for sub_number, sub_wire_type, sub_value in iter_fields(data, *value):
+                    if sub_number == key_number and sub_wire_type == WIRETYPE_VARINT:
+                        key = sub_value
+                        break
+                keys.append((name, key))
+
+        if template_id is None:
+            return
+
+        self._offsets[template_id] = offsets
+        for name, key in keys:
+            if name == 'player_level':
+                self._player_level = template_id
+            else:
+                self._indexes[name][key] = template_id
+
+    def update(self, response):
+        """
+        Takes a DownloadItemTemplatesResponse, returns True if it differed
+        from the stored templates (and replaced them).
+        """
+        if not response.success or response.timestamp_ms == self._timestamp_ms:
+            return False
+
+        raw = response.SerializeToString()
+        with self._lock:
+            self._load(raw)
+
+        self.log.info('Stored %s item templates of %s', len(self._offsets), self._timestamp_ms)
+
+        if self._path is not None:
+            try:
+                write_file_atomic(self._path, raw)
+            except (IOError, OSError) as e:
+                self.log.warning('Could not write item template cache %s: %s', self._path, e)
+
+        return True
+
+    def sync(self, api, timestamp_ms = None, **remote_config):
+        """
+        Downloads the item templates with api if they changed. timestamp_ms is
+        the item_templates_timestamp_ms of a DOWNLOAD_REMOTE_CONFIG_VERSION
+        response; if None, that RPC is sent with remote_config as arguments
+        (e.g. platform=1, app_version=...). Returns True if templates were downloaded.
+        """
+        if timestamp_ms is None:
+            request = api.create_request()
+            request.download_remote_config_version(**remote_config)
+            response = request.call(response_format = RESPONSE_FORMAT_PROTOBUF)
+            if not response:
+                return False
+            timestamp_ms = response['responses']['DOWNLOAD_REMOTE_CONFIG_VERSION'].item_templates_timestamp_ms
+
+        if timestamp_ms and timestamp_ms == self._timestamp_ms:
+            self.log.debug('Item templates of %s are up to date', timestamp_ms)
+            return False
+
+        request = api.create_request()
+        request.download_item_templates()
+        response = request.call(response_format = RESPONSE_FORMAT_PROTOBUF)
+        if not response:
+            return False
+
+        return self.update(response['responses']['DOWNLOAD_ITEM_TEMPLATES'])
+
+    def get_timestamp_ms(self):
+        return self._timestamp_ms
+
+    def get_template_ids(self):
+        return list(self._offsets.keys())
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, template_id):
+        return template_id in self._offsets
+
+    def get_template(self, template_id):
+        """ Returns the ItemTemplate message of a template_id or None """
+        with self._lock:
+            template = self._templates.get(template_id)
+            if template is None:
+                offsets = self._offsets.get(template_id)
+                if offsets is None:
+                    return None
+
+                template = DownloadItemTemplatesResponse.ItemTemplate()
+                template.ParseFromString(bytes(self._raw[offsets[0]:offsets[1]]))
+                self._templates[template_id] = template
+            return template
+
+    def _get_indexed(self, name, key):
+        template_id = self._indexes[name].get(key)
+        if template_id is None:
+            return None
+        return getattr(self.get_template(template_id), INDEXES[name][0])
+
+    def get_pokemon(self, pokemon_id):
+        """ PokemonSettings of a pokemon id """
+        return self._get_indexed('pokemon', pokemon_id)
+
+    def get_move(self, move_id):
+        """ MoveSettings of a move id """
+        return self._get_indexed('move', move_id)
+
+    def get_item(self, item_id):
+        """ ItemSettings of an item id """
+        return self._get_indexed('item', item_id)
+
+    def get_type_effective(self, attack_type):
+        """ TypeEffectiveSettings of an attacking pokemon type """
+        return self._get_indexed('type_effective', attack_type)
+
+    def get_badge(self, badge_type):
+        return self._get_indexed('badge', badge_type)
+
+    def get_player_level(self):
+        """ PlayerLevelSettings (experience and cp multiplier per level) """
+        if self._player_level is None:
+            return None
+        return self.get_template(self._player_level).player_level
+
+    def get_ids(self, name):
+        """ Indexed keys of INDEXES name, e.g. all pokemon ids with settings """
+        return list(self._indexes[name].keys())
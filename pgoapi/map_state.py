@@ -0,0 +1,210 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from pgoapi.utilities import get_map_cells
+
+FORT = 'fort'
+SPAWN_POINT = 'spawn_point'
+WILD_POKEMON = 'wild_pokemon'
+CATCHABLE_POKEMON = 'catchable_pokemon'
+NEARBY_POKEMON = 'nearby_pokemon'
+
+ADDED = 'added'
+UPDATED = 'updated'
+REMOVED = 'removed'
+
+# kind -> (MapCell field, key fields, version field or None to compare whole objects)
+OBJECT_KINDS = {
+    FORT: ('forts', ('id',), 'last_modified_timestamp_ms'),
+    SPAWN_POINT: ('spawn_points', ('latitude', 'longitude'), None),
+    WILD_POKEMON: ('wild_pokemons', ('encounter_id',), 'last_modified_timestamp_ms'),
+    CATCHABLE_POKEMON: ('catchable_pokemons', ('encounter_id',), None),
+    NEARBY_POKEMON: ('nearby_pokemons', ('encounter_id',), None),
+}
+
+# pokemon are always sent in full per cell, forts and spawn points only change
+# through additions and deleted_objects once a cell was received
+SNAPSHOT_KINDS = frozenset([WILD_POKEMON, CATCHABLE_POKEMON, NEARBY_POKEMON])
+
+
+def _get(obj, field, default = None):
+    if isinstance(obj, dict):
+        return obj.get(field, default)
+    return getattr(obj, field)
+
+
+class MapChange:
+    """ One change of the map state: action (ADDED/UPDATED/REMOVED) of an object of a kind in a cell """
+
+    __slots__ = ('kind', 'action', 'key', 'cell_id', 'obj')
+
+    def __init__(self, kind, action, key, cell_id, obj):
+        self.kind = kind
+        self.action = action
+        self.key = key
+        self.cell_id = cell_id
+        self.obj = obj
+
+    def __repr__(self):
+        return '<MapChange {} {} {} in {}>'.format(self.action, self.kind, self.key, self.cell_id)
+
+
+class MapState:
+    """
+    Current map objects per S2 cell, built from GET_MAP_OBJECTS responses.
+
+    ingest() applies a response (dict or protobuf format) cell by cell and
+    returns the resulting MapChange list; registered listeners receive the
+    same list. Forts and wild pokemon count as updated if their
+    last_modified_timestamp_ms grew, other pokemon if they differ. Objects
+    listed in a cell's deleted_objects are removed, pokemon missing from a
+    cell's (not truncated) list are removed as well since the server always
+    sends all pokemon of a cell.
+
+    Works together with the incremental responses of PGoApi.query_map().
+    """
+
+    def __init__(self):
+
+        self.log = logging.getLogger(__name__)
+
+        self._lock = threading.RLock()
+        self._cells = {}
+        self._cell_timestamps = {}
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """ Registers a callable which is called with the list of MapChanges of every ingest() """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def ingest(self, response, full = False):
+        """
+        Applies the GET_MAP_OBJECTS result of a response, returns the list of
+        MapChanges. With full=True every cell of the response replaces the
+        known content of the cell (for responses queried without since_timestamp_ms).
+        """
+        cells = get_map_cells(response)
+        if cells is None:
+            return []
+
+        changes = []
+        with self._lock:
+            for cell in cells:
+                self._ingest_cell(cell, full, changes)
+
+        if changes:
+            self.log.debug('Map state changed: %s changes in %s cells', len(changes), len(cells))
+            for listener in self._listeners:
+                listener(changes)
+
+        return changes
+
+    def _ingest_cell(self, cell, full, changes):
+        cell_id = _get(cell, 's2_cell_id')
+        known = cell_id in self._cells
+        objects = self._cells.setdefault(cell_id, dict((kind, {}) for kind in OBJECT_KINDS))
+        truncated = _get(cell, 'is_truncated_list', False)
+
+        timestamp_ms = _get(cell, 'current_timestamp_ms', 0)
+        if timestamp_ms:
+            self._cell_timestamps[cell_id] = timestamp_ms
+
+        for kind, (field, key_fields, version_field) in OBJECT_KINDS.items():
+            stored = objects[kind]
+            seen = set()
+
+            for obj in _get(cell, field, []):
+                key = tuple(_get(obj, key_field) for key_field in key_fields)
+                key = key[0] if len(key) == 1 else key
+                seen.add(key)
+
+                old = stored.get(key)
+                if old is None:
+                    action = ADDED
+                elif version_field is not None:
+                    action = UPDATED if _get(obj, version_field, 0) > _get(old, version_field, 0) else None
+                else:
+                    action = UPDATED if obj != old else None
+
+                if action is not None:
+                    stored[key] = obj
+                    changes.append(MapChange(kind, action, key, cell_id, obj))
+
+            replace = (full or not known or kind in SNAPSHOT_KINDS) and not truncated
+            if replace:
+                for key in [key for key in stored if key not in seen]:
+                    changes.append(MapChange(kind, REMOVED, key, cell_id, stored.pop(key)))
+
+        deleted = set(_get(cell, 'deleted_objects', []))
+        if deleted:
+            for kind, stored in objects.items():
+                for key in [key for key in stored if str(key) in deleted]:
+                    changes.append(MapChange(kind, REMOVED, key, cell_id, stored.pop(key)))
+
+    def remove_cell(self, cell_id):
+        """ Drops a cell, returns (and emits) REMOVED changes for its objects """
+        with self._lock:
+            objects = self._cells.pop(cell_id, None)
+            self._cell_timestamps.pop(cell_id, None)
+            if objects is None:
+                return []
+
+            changes = [MapChange(kind, REMOVED, key, cell_id, obj)
+                       for kind, stored in objects.items() for key, obj in stored.items()]
+
+        if changes:
+            for listener in self._listeners:
+                listener(changes)
+        return changes
+
+    def get_cell_ids(self):
+        with self._lock:
+            return list(self._cells.keys())
+
+    def get_cell_timestamp(self, cell_id):
+        return self._cell_timestamps.get(cell_id, 0)
+
+    def get_cell_objects(self, cell_id, kind):
+        """ {key: object} of one kind in a cell """
+        with self._lock:
+            return dict(self._cells.get(cell_id, {}).get(kind, {}))
+
+    def get_objects(self, kind):
+        """ All objects of a kind in all cells """
+        with self._lock:
+            return [obj for objects in self._cells.values() for obj in objects[kind].values()]
+
+    def count(self, kind = None):
+        with self._lock:
+            kinds = [kind] if kind is not None else OBJECT_KINDS.keys()
+            return sum(len(objects[k]) for objects in self._cells.values() for k in kinds)
@@ -0,0 +1,235 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from six.moves.socketserver import ThreadingMixIn
+
+from pgoapi.exceptions import ServerBusyOrOfflineException
+
+# RPC latency buckets in seconds
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STATUS_CODE_THROTTLED = 52
+STATUS_CODE_AUTH_FAILED = 102
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(label_names, label_values, extra = ()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, _escape_label_value(value)) for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+
+    def __init__(self, name, documentation, label_names = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values = (), amount = 1):
+        label_values = tuple(label_values)
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, label_values = ()):
+        return self._values.get(tuple(label_values), 0)
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.documentation), '# TYPE {} counter'.format(self.name)]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append('{}{} {}'.format(self.name, _format_labels(self.label_names, label_values), _format_value(value)))
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, label_names = (), buckets = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+        # label values -> [bucket counts..., sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        label_values = tuple(label_values)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def get_count(self, label_values = ()):
+        entry = self._values.get(tuple(label_values))
+        return entry[-1] if entry else 0
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.documentation), '# TYPE {} histogram'.format(self.name)]
+        with self._lock:
+            for label_values, entry in sorted(self._values.items()):
+                for i, bound in enumerate(self.buckets):
+                    lines.append('{}_bucket{} {}'.format(self.name,
+                        _format_labels(self.label_names, label_values, [('le', _format_value(bound))]), entry[i]))
+                labels = _format_labels(self.label_names, label_values)
+                lines.append('{}_sum{} {}'.format(self.name, labels, _format_value(entry[-2])))
+                lines.append('{}_count{} {}'.format(self.name, labels, entry[-1]))
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Collects RPC counters and latency histograms per request type and account.
+
+    Register it as RPC hook on every PGoApi instance whose calls should be
+    counted (one registry can be shared by many accounts):
+
+        metrics = MetricsRegistry()
+        api.add_rpc_hook(metrics.observe_rpc)
+        start_http_server(metrics, 9100)
+
+    The endpoint only listens on localhost by default, pass e.g.
+    addr = '0.0.0.0' to let a remote Prometheus scrape it.
+    """
+
+    def __init__(self, buckets = DEFAULT_BUCKETS):
+        self.rpc_requests = Counter('pgoapi_rpc_requests_total',
+            'Subrequests sent, by request type and account.', ('request_type', 'account'))
+        self.rpc_latency = Histogram('pgoapi_rpc_duration_seconds',
+            'RPC latency (build to response conversion) of RPCs containing the request type.', ('request_type', 'account'), buckets)
+        self.throttled = Counter('pgoapi_rpc_throttled_total',
+            'RPCs throttled by the server (status code 52).', ('account',))
+        self.auth_failures = Counter('pgoapi_rpc_auth_failures_total',
+            'RPCs rejected as not logged in (status code 102).', ('account',))
+        self.server_busy = Counter('pgoapi_rpc_server_busy_total',
+            'RPCs failed with ServerBusyOrOfflineException.', ('account',))
+        self.errors = Counter('pgoapi_rpc_errors_total',
+            'RPCs failed with an exception, by exception type.', ('account', 'error'))
+        self.bytes_sent = Counter('pgoapi_rpc_sent_bytes_total',
+            'Serialized request envelope bytes sent.', ('account',))
+        self.bytes_received = Counter('pgoapi_rpc_received_bytes_total',
+            'Response envelope bytes received.', ('account',))
+        self.ticket_refreshes = Counter('pgoapi_auth_ticket_refreshes_total',
+            'New auth tickets received from the server.', ('account',))
+
+        self._metrics = [self.rpc_requests, self.rpc_latency, self.throttled, self.auth_failures, self.server_busy,
+            self.errors, self.bytes_sent, self.bytes_received, self.ticket_refreshes]
+
+    def observe_rpc(self, stats):
+        account = (stats.account or '',)
+
+        latency = stats.get_total_ms() / 1000.0
+        for request_type in stats.request_types:
+            labels = (request_type,) + account
+            self.rpc_requests.inc(labels)
+            self.rpc_latency.observe(labels, latency)
+
+        if stats.status_code == STATUS_CODE_THROTTLED:
+            self.throttled.inc(account)
+        elif stats.status_code == STATUS_CODE_AUTH_FAILED:
+            self.auth_failures.inc(account)
+
+        if isinstance(stats.error, ServerBusyOrOfflineException):
+            self.server_busy.inc(account)
+        if stats.error is not None:
+            self.errors.inc(account + (stats.error.__class__.__name__,))
+
+        if stats.request_bytes:
+            self.bytes_sent.inc(account, stats.request_bytes)
+        if stats.response_bytes:
+            self.bytes_received.inc(account, stats.response_bytes)
+        if stats.ticket_refreshed:
+            self.ticket_refreshes.inc(account)
+
+    def render(self):
+        """ Returns all metrics in the Prometheus text exposition format """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        lines.append('')
+        return '\n'.join(lines)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    registry = None
+
+    def do_GET(self):
+        output = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(output)))
+        self.end_headers()
+        self.wfile.write(output)
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(format, *args)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def start_http_server(registry, port, addr = '127.0.0.1'):
+    """
+    Serves the registry in Prometheus text format on http://addr:port/ from
+    a daemon thread. Returns the server, call shutdown() on it to stop.
+
+    The metrics contain account names, so only the loopback interface is
+    bound unless another addr ('' or '0.0.0.0' for all interfaces) is given.
+    """
+    handler = type('MetricsHandler', (_MetricsHandler, object), {'registry': registry})
+    server = _ThreadingHTTPServer((addr, port), handler)
+
+    thread = threading.Thread(target=server.serve_forever, name='pgoapi-metrics')
+    thread.daemon = True
+    thread.start()
+
+    return server
@@ -27,27 +27,44 @@ from __future__ import absolute_import
 
 import re
 import six
+import time
 import logging
 import requests
 
 from . import __title__, __version__, __copyright__
-from pgoapi.rpc_api import RpcApi
+from pgoapi.rpc_api import RpcApi, UNMAPPED_REQUEST_TYPES, RESPONSE_FORMAT_DICT, RESPONSE_FORMAT_PROTOBUF, RESPONSE_FORMATS
+from pgoapi.transport import HttpTransport
+from pgoapi.retry import RetryState, RETRY_AUTH, get_retry_kind
 from pgoapi.auth_ptc import AuthPtc
 from pgoapi.auth_google import AuthGoogle
-from pgoapi.exceptions import AuthException, NotLoggedInException, ServerBusyOrOfflineException, NoPlayerPositionSetException, EmptySubrequestChainException
+from pgoapi.utilities import Deadline, get_cell_ids
+from pgoapi.cell_timestamps import CellTimestampCache
+from pgoapi.settings_cache import DEFAULT_SETTINGS_HASH, get_default_settings_cache
+from pgoapi.exceptions import AuthException, NotLoggedInException, ServerBusyOrOfflineException, NoPlayerPositionSetException, EmptySubrequestChainException, ServerSideRequestThrottlingException, DeadlineExceededException
 
 from . import protos
 from POGOProtos.Networking.Requests_pb2 import RequestType
 
 logger = logging.getLogger(__name__)
 
+# minimum remaining lifetime in seconds of a cached access token to be reused
+CREDENTIAL_EXPIRY_MARGIN = 300
+
 class PGoApi:
 
-    def __init__(self):
+    def __init__(self, transport = None, response_format = RESPONSE_FORMAT_DICT):
 
         self.set_logger()
 
         self._auth_provider = None
+        self._transport = transport or HttpTransport()
+        self.set_response_format(response_format)
+        self._rpc_hooks = []
+        self._rate_limiter = None
+        self._retry_policy = None
+        self._credential_store = None
+        self._settings_cache = None
+        self._cell_timestamps = CellTimestampCache()
         self._api_endpoint = 'https://pgorelease.nianticlabs.com/plfe/rpc'
 
         self._position_lat = None
@@ -62,6 +79,116 @@ class PGoApi:
     def get_api_endpoint(self):
         return self._api_endpoint
 
+    def get_auth_provider(self):
+        return self._auth_provider
+
+    def get_transport(self):
+        return self._transport
+
+    def set_transport(self, transport):
+        self._transport = transport
+
+    def get_response_format(self):
+        return self._response_format
+
+    def set_response_format(self, response_format):
+        """
+        'dict' returns the response envelope and all subresponses converted to
+        dictionaries, 'protobuf' returns {'envelope': ResponseEnvelope,
+        'responses': {'GET_PLAYER': GetPlayerResponse, ...}} without conversion.
+        """
+        if response_format not in RESPONSE_FORMATS:
+            raise ValueError("Invalid response format '{}' - only {} available.".format(response_format, '/'.join(RESPONSE_FORMATS)))
+
+        self._response_format = response_format
+
+    def add_rpc_hook(self, hook):
+        """
+        Registers a callable which is called with a RpcStats object (timing
+        breakdown, sizes, request types and error) after every RPC.
+        """
+        self._rpc_hooks.append(hook)
+
+    def remove_rpc_hook(self, hook):
+        self._rpc_hooks.remove(hook)
+
+    def get_rate_limiter(self):
+        return self._rate_limiter
+
+    def set_rate_limiter(self, rate_limiter):
+        """
+        Sets a rate limiter (e.g. AdaptiveRateLimiter) every request of this
+        account has to pass before it is sent, None disables rate limiting.
+        """
+        self._rate_limiter = rate_limiter
+
+    def get_retry_policy(self):
+        return self._retry_policy
+
+    def set_retry_policy(self, retry_policy):
+        """
+        Sets the RetryPolicy used by requests of this account, None disables
+        retries (a failed call returns None/False or raises as before).
+        """
+        self._retry_policy = retry_policy
+
+    def get_credential_store(self):
+        return self._credential_store
+
+    def set_credential_store(self, credential_store):
+        """
+        Sets a CredentialStore which caches the access token, auth ticket and
+        API endpoint of this account. login() resumes from a still valid cache
+        entry without any auth or RPC round trip.
+        """
+        self._credential_store = credential_store
+
+    def get_settings_cache(self):
+        return self._settings_cache or get_default_settings_cache()
+
+    def set_settings_cache(self, settings_cache):
+        """ Sets the SettingsCache of this account, None uses the process wide default cache """
+        self._settings_cache = settings_cache
+
+    def get_settings(self):
+        """ Returns the GlobalSettings of the last DOWNLOAD_SETTINGS call (e.g. of the login sequence) """
+        return self.get_settings_cache().get_settings()
+
+    def get_cell_timestamps(self):
+        return self._cell_timestamps
+
+    def set_cell_timestamps(self, cell_timestamps):
+        """ Sets the CellTimestampCache used by query_map(), may be shared by several accounts """
+        self._cell_timestamps = cell_timestamps
+
+    def query_map(self, lat = None, lng = None, cell_ids = None, radius = 500, **kwargs):
+        """
+        Sends GET_MAP_OBJECTS for the cells around a position (default: the
+        player position) with the since_timestamp_ms of every cell taken from
+        the CellTimestampCache, so only changes since the last query of a cell
+        are returned. The cell timestamps of the response are recorded.
+
+        :param cell_ids: S2 cell ids to query, default the level 15 cells within radius meters
+        :param kwargs: passed to PGoApiRequest.call()
+        """
+        request = self._create_map_request(lat, lng, cell_ids, radius)
+        response = request.call(**kwargs)
+
+        if response:
+            self._cell_timestamps.update(response)
+        return response
+
+    def _create_map_request(self, lat, lng, cell_ids, radius):
+        if lat is None or lng is None:
+            lat, lng = self._position_lat, self._position_lng
+        if cell_ids is None:
+            cell_ids = get_cell_ids(lat, lng, radius)
+
+        request = self.create_request()
+        request.get_map_objects(latitude = lat, longitude = lng, cell_id = cell_ids,
+                                since_timestamp_ms = self._cell_timestamps.get_timestamps(cell_ids))
+        return request
+
     def get_position(self):
         return (self._position_lat, self._position_lng, self._position_alt)
 
@@ -73,7 +200,7 @@ class PGoApi:
         self._position_alt = alt
         
     def create_request(self):    
-        request = PGoApiRequest(self._api_endpoint, self._auth_provider, self._position_lat, self._position_lng, self._position_alt)
+        request = PGoApiRequest(self._api_endpoint, self._auth_provider, self._position_lat, self._position_lng, self._position_alt, self._transport, self._response_format, self._rpc_hooks, self._rate_limiter, self._retry_policy)
         return request
 
     def __getattr__(self, func):
@@ -88,7 +215,36 @@ class PGoApi:
         else:
             raise AttributeError
         
-    def login(self, provider, username, password, lat = None, lng = None, alt = None, app_simulation = True):
+    def login(self, provider, username, password, lat = None, lng = None, alt = None, app_simulation = True, deadline = None):
+        """
+        :param deadline: utilities.Deadline or timeout in seconds covering the
+           whole login including the initial RPC sequence
+        """
+
+        deadline = Deadline.from_value(deadline)
+        self._prepare_login(provider, username, password, lat, lng, alt)
+
+        if self._restore_credentials(provider, username, password):
+            return True
+
+        if not self._auth_provider.is_login() and not self._auth_provider.login(username, password, deadline = deadline):
+            self.log.info('Login process failed')
+            return False
+
+        request = self._create_login_request(app_simulation)
+        response = request.call(response_format = RESPONSE_FORMAT_PROTOBUF, deadline = deadline)
+
+        return self._finish_login(response, app_simulation)
+
+    def _create_auth_provider(self, provider):
+        if provider == 'ptc':
+            return AuthPtc()
+        elif provider == 'google':
+            return AuthGoogle()
+        else:
+            raise AuthException("Invalid authentication provider - only ptc/google available.")
+
+    def _prepare_login(self, provider, username, password, lat, lng, alt):
 
         if lat and lng and alt:
             self._position_lat = lat
@@ -98,64 +254,143 @@ class PGoApi:
         if not isinstance(username, six.string_types) or not isinstance(password, six.string_types):
             raise AuthException("Username/password not correctly specified")
 
-        if provider == 'ptc':
-            self._auth_provider = AuthPtc()
-        elif provider == 'google':
-            self._auth_provider = AuthGoogle()
-        else:
-            raise AuthException("Invalid authentication provider - only ptc/google available.")
+        self._auth_provider = self._create_auth_provider(provider)
 
         self.log.debug('Auth provider: %s', provider)
 
-        if not self._auth_provider.login(username, password):
-            self.log.info('Login process failed')
+    def refresh_ticket(self, deadline = None):
+        """
+        Requests a new auth ticket with the access token. The current ticket
+        stays in use by other requests until the new one replaces it.
+        """
+        if self._auth_provider is None or not self._auth_provider.is_login():
+            return False
+
+        request = PGoApiRequest(self._api_endpoint, _TokenAuth(self._auth_provider), self._position_lat, self._position_lng, self._position_alt, self._transport, RESPONSE_FORMAT_DICT, self._rpc_hooks, self._rate_limiter)
+        request.get_player()
+        return bool(request.call(deadline = deadline))
+
+    def _restore_credentials(self, provider, username, password):
+        """
+        Restores the cached access token (if it is valid for at least another
+        CREDENTIAL_EXPIRY_MARGIN seconds) and returns True if the cached auth
+        ticket and API endpoint are still valid as well, so no login RPC is needed.
+        """
+        if self._credential_store is None:
+            return False
+
+        cached = self._credential_store.load(provider, username)
+        if not cached:
+            return False
+
+        token_expiry = cached.get('token_expiry')
+        if not cached.get('token') or not token_expiry or token_expiry - time.time() < CREDENTIAL_EXPIRY_MARGIN:
+            self.log.debug('Cached access token of %s expired', username)
             return False
 
+        self._auth_provider.restore_login(username, password, cached['token'], token_expiry)
+        self.log.info('Restored cached access token of %s', username)
+
+        ticket = cached.get('ticket')
+        if not ticket or not cached.get('api_endpoint'):
+            return False
+
+        self._auth_provider.set_ticket(ticket)
+        if not self._auth_provider.check_ticket():
+            return False
+
+        self._api_endpoint = cached['api_endpoint']
+        self._track_credentials()
+        self.log.info('Resumed cached session of %s - login skipped', username)
+        return True
+
+    def _track_credentials(self):
+        if self._credential_store is None:
+            return
+
+        self._save_credentials(self._auth_provider)
+        self._auth_provider.add_ticket_listener(self._save_credentials)
+
+    def _save_credentials(self, auth_provider):
+        self._credential_store.save(auth_provider.get_name(), auth_provider.get_username(), {
+            'token': auth_provider.get_token(),
+            'token_expiry': auth_provider.get_token_expiry(),
+            'ticket': auth_provider.get_ticket() or None,
+            'api_endpoint': self._api_endpoint,
+        })
+
+    def _create_login_request(self, app_simulation):
+        request = self.create_request()
+
         if app_simulation:
             self.log.info('Starting RPC login sequence (app simulation)')
 
             # making a standard call, like it is also done by the client
-            request = self.create_request()
-
             request.get_player()
             request.get_hatched_eggs()
             request.get_inventory()
             request.check_awarded_badges()
-            request.download_settings(hash="05daf51635c82611d1aac95c0b051d3ec088a930")
-
-            response = request.call()
+            request.download_settings(hash=self.get_settings_cache().get_hash() or DEFAULT_SETTINGS_HASH)
         else:
             self.log.info('Starting minimal RPC login sequence')
-            response = self.get_player()
+            request.get_player(_call_direct = True)
+
+        return request
+
+    def _finish_login(self, response, app_simulation):
 
         if not response:
             self.log.info('Login failed!')
             return False
 
-        if 'api_url' in response:
-            self._api_endpoint = ('https://{}/rpc'.format(response['api_url']))
+        api_url = response['envelope'].api_url
+        if api_url:
+            self._api_endpoint = ('https://{}/rpc'.format(api_url))
             self.log.debug('Setting API endpoint to: %s', self._api_endpoint)
         else:
             self.log.error('Login failed - unexpected server response!')
             return False
 
+        settings = response['responses'].get('DOWNLOAD_SETTINGS')
+        if settings is not None and not isinstance(settings, six.string_types):
+            self.get_settings_cache().update(settings)
+
         if app_simulation:
             self.log.info('Finished RPC login sequence (app simulation)')
         else:
             self.log.info('Finished minimal RPC login sequence')
 
+        self._track_credentials()
         self.log.info('Login process completed')
 
         return True
-        
+
+
+class _TokenAuth:
+    """ View of an Auth object hiding its ticket, so requests authenticate with the access token """
+
+    def __init__(self, auth_provider):
+        self._auth_provider = auth_provider
+
+    def get_ticket(self):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._auth_provider, name)
+
 
 class PGoApiRequest:
-    def __init__(self, api_endpoint, auth_provider, position_lat, position_lng, position_alt):
+    def __init__(self, api_endpoint, auth_provider, position_lat, position_lng, position_alt, transport = None, response_format = RESPONSE_FORMAT_DICT, rpc_hooks = None, rate_limiter = None, retry_policy = None):
         self.log = logging.getLogger(__name__)
 
         """ Inherit necessary parameters """
         self._api_endpoint = api_endpoint
         self._auth_provider = auth_provider
+        self._transport = transport
+        self._response_format = response_format
+        self._rpc_hooks = rpc_hooks
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
 
         self._position_lat = position_lat
         self._position_lng = position_lng
@@ -163,25 +398,49 @@ class PGoApiRequest:
 
         self._req_method_list = []
 
-    def call(self):
-        if not self._req_method_list:
-            raise EmptySubrequestChainException()
-            
-        if (self._position_lat is None) or (self._position_lng is None) or (self._position_alt is None):
-            raise NoPlayerPositionSetException()
-
-        if self._auth_provider is None or not self._auth_provider.is_login():
-            self.log.info('Not logged in')
+    def call(self, response_format = None, retry_policy = None, deadline = None):
+        """
+        :param deadline: utilities.Deadline or timeout in seconds shared by all
+           attempts of this call, DeadlineExceededException is raised once it expires
+        """
+        if not self._check_call():
             return NotLoggedInException()
 
-        request = RpcApi(self._auth_provider)
-
-        self.log.info('Execution of RPC')
-        response = None
-        try:
-            response = request.request(self._api_endpoint, self._req_method_list, self.get_position())
-        except ServerBusyOrOfflineException as e:
+        deadline = Deadline.from_value(deadline)
+        request = RpcApi(self._auth_provider, self._transport, response_format or self._response_format, self._rpc_hooks)
+        retry = RetryState(retry_policy or self._retry_policy, deadline)
+
+        while True:
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire()
+
+            self.log.info('Execution of RPC')
+            response = error = None
+            token = self._auth_provider.get_token()
+            try:
+                response = request.request(self._api_endpoint, self._req_method_list, self.get_position(), deadline)
+            except (ServerBusyOrOfflineException, ServerSideRequestThrottlingException, NotLoggedInException) as e:
+                error = e
+            self._rate_limiter_feedback(error or response)
+
+            kind = get_retry_kind(error, response, request.get_http_status())
+            delay = retry.next_delay(kind)
+            if delay is None:
+                break
+
+            if kind == RETRY_AUTH and not self._auth_provider.relogin(deadline = deadline, failed_token = token):
+                self.log.info('Re-login failed - giving up')
+                break
+
+            self.log.info('RPC failed (%s) - attempt %s in %.2fs', kind, retry.get_attempts(), delay)
+            time.sleep(delay)
+
+        if error is not None and retry.is_deadline_exceeded():
+            raise DeadlineExceededException('Deadline exceeded after %s attempts' % retry.get_attempts())
+        elif isinstance(error, ServerBusyOrOfflineException):
             self.log.info('Server seems to be busy or offline - try again!')
+        elif error is not None:
+            raise error
 
         # cleanup after call execution
         self.log.info('Cleanup of request!')
@@ -189,6 +448,38 @@ class PGoApiRequest:
 
         return response
 
+    def _rate_limiter_feedback(self, result):
+        if self._rate_limiter is None:
+            return
+
+        if isinstance(result, ServerSideRequestThrottlingException):
+            self._rate_limiter.on_throttle()
+        elif result and not isinstance(result, Exception):
+            self._rate_limiter.on_success()
+
+    def _check_call(self):
+        if not self._req_method_list:
+            raise EmptySubrequestChainException()
+
+        if (self._position_lat is None) or (self._position_lng is None) or (self._position_alt is None):
+            raise NoPlayerPositionSetException()
+
+        if self._auth_provider is None or not self._auth_provider.is_login():
+            self.log.info('Not logged in')
+            return False
+
+        return True
+
+    def get_method_args(self, name):
+        """ Arguments of the first RPC called name (e.g. 'GET_MAP_OBJECTS') in the chain, None if it is not part of it """
+        request_type = RequestType.Value(name)
+        for method in self._req_method_list:
+            if isinstance(method, dict) and request_type in method:
+                return method[request_type]
+            elif method == request_type:
+                return {}
+        return None
+
     def list_curr_methods(self):
         for i in self._req_method_list:
             print("{} ({})".format(RequestType.Name(i), i))
@@ -213,6 +504,9 @@ class PGoApiRequest:
                 self.log.info('Creating a new request...')
 
             name = func.upper()
+            if name in UNMAPPED_REQUEST_TYPES:
+                self.log.warning("No protobuf definition available for '%s' - its response will not be parsed", name)
+
             if kwargs:
                 self._req_method_list.append({RequestType.Value(name): kwargs})
                 self.log.info("Adding '%s' to RPC request including arguments", name)
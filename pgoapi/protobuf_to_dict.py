@@ -1,4 +1,5 @@
 import base64
+import threading
 
 import six
 
@@ -33,6 +34,27 @@ TYPE_CALLABLE_MAP = {
 }
 
 
+# field types whose protobuf python value already equals the converted value
+# when the default TYPE_CALLABLE_MAP is used (python 3 only, see _compile_field)
+IDENTITY_TYPE_CALLABLES = {
+    FieldDescriptor.TYPE_DOUBLE: float,
+    FieldDescriptor.TYPE_FLOAT: float,
+    FieldDescriptor.TYPE_INT32: int,
+    FieldDescriptor.TYPE_INT64: int,
+    FieldDescriptor.TYPE_UINT32: int,
+    FieldDescriptor.TYPE_UINT64: int,
+    FieldDescriptor.TYPE_SINT32: int,
+    FieldDescriptor.TYPE_SINT64: int,
+    FieldDescriptor.TYPE_FIXED32: int,
+    FieldDescriptor.TYPE_FIXED64: int,
+    FieldDescriptor.TYPE_SFIXED32: int,
+    FieldDescriptor.TYPE_SFIXED64: int,
+    FieldDescriptor.TYPE_BOOL: bool,
+    FieldDescriptor.TYPE_STRING: six.text_type,
+    FieldDescriptor.TYPE_ENUM: int,
+}
+
+
 def repeated(type_callable):
     return lambda value_list: [type_callable(value) for value in value_list]
 
@@ -42,13 +64,29 @@ def enum_label_name(field, value):
 
 
 def protobuf_to_dict(pb, type_callable_map=TYPE_CALLABLE_MAP, use_enum_labels=False):
+    """Converts a protobuf message into a dictionary.
+
+    A conversion function is compiled once per message descriptor (and
+    type_callable_map/use_enum_labels combination) and cached, so no
+    adaptors are created while converting.
+    """
+    converters = _get_converter_cache(type_callable_map, use_enum_labels)
+    converter = converters.get(pb.DESCRIPTOR)
+    if converter is None:
+        converter = _compile_converter(pb.DESCRIPTOR, type_callable_map, use_enum_labels, converters)
+    return converter(pb)
+
+
+def _protobuf_to_dict_uncompiled(pb, type_callable_map=TYPE_CALLABLE_MAP, use_enum_labels=False):
+    """Reference implementation of protobuf_to_dict without compiled converters"""
     result_dict = {}
     extensions = {}
     for field, value in pb.ListFields():
         if field.message_type and field.message_type.has_options and field.message_type.GetOptions().map_entry:
             result_dict[field.name] = dict(value)
             continue
-        type_callable = _get_field_value_adaptor(pb, field, type_callable_map, use_enum_labels)
+        type_callable = _get_field_value_adaptor(pb, field, type_callable_map, use_enum_labels,
+                                                 _protobuf_to_dict_uncompiled)
         if field.label == FieldDescriptor.LABEL_REPEATED:
             type_callable = repeated(type_callable)
 
@@ -63,10 +101,11 @@ def protobuf_to_dict(pb, type_callable_map=TYPE_CALLABLE_MAP, use_enum_labels=Fa
     return result_dict
 
 
-def _get_field_value_adaptor(pb, field, type_callable_map=TYPE_CALLABLE_MAP, use_enum_labels=False):
+def _get_field_value_adaptor(pb, field, type_callable_map=TYPE_CALLABLE_MAP, use_enum_labels=False,
+                             message_to_dict=protobuf_to_dict):
     if field.type == FieldDescriptor.TYPE_MESSAGE:
         # recursively encode protobuf sub-message
-        return lambda pb: protobuf_to_dict(
+        return lambda pb: message_to_dict(
             pb, type_callable_map=type_callable_map,
             use_enum_labels=use_enum_labels)
 
@@ -80,6 +119,103 @@ def _get_field_value_adaptor(pb, field, type_callable_map=TYPE_CALLABLE_MAP, use
         pb.__class__.__name__, field.name, field.type))
 
 
+# id(type_callable_map), use_enum_labels -> (type_callable_map, {descriptor: converter})
+_converter_caches = {}
+_compile_lock = threading.Lock()
+
+
+def _get_converter_cache(type_callable_map, use_enum_labels):
+    key = (id(type_callable_map), use_enum_labels)
+    entry = _converter_caches.get(key)
+    if entry is None or entry[0] is not type_callable_map:
+        # keep a reference to the map, so its id can not be reused
+        entry = _converter_caches.setdefault(key, (type_callable_map, {}))
+    return entry[1]
+
+
+def _compile_converter(descriptor, type_callable_map, use_enum_labels, converters):
+    with _compile_lock:
+        converter = converters.get(descriptor)
+        if converter is None:
+            # nested (and recursive) descriptors are compiled into a private
+            # dict first, so other threads never see half-built converters
+            compiled = {}
+            converter = _compile_message(descriptor, type_callable_map, use_enum_labels, converters, compiled)
+            converters.update(compiled)
+    return converter
+
+
+def _compile_message(descriptor, type_callable_map, use_enum_labels, converters, compiled):
+    fields = {}
+
+    def convert(pb):
+        result_dict = {}
+        extensions = None
+        for field, value in pb.ListFields():
+            compiled_field = fields.get(field)
+            if compiled_field is None:
+                # only extensions are not part of the compiled descriptor
+                if extensions is None:
+                    extensions = {}
+                type_callable = _get_field_value_adaptor(pb, field, type_callable_map, use_enum_labels)
+                if field.label == FieldDescriptor.LABEL_REPEATED:
+                    type_callable = repeated(type_callable)
+                extensions[str(field.number)] = type_callable(value)
+                continue
+
+            name, type_callable = compiled_field
+            result_dict[name] = value if type_callable is None else type_callable(value)
+
+        if extensions:
+            result_dict[EXTENSION_CONTAINER] = extensions
+        return result_dict
+
+    # register before compiling the fields to resolve recursive messages
+    compiled[descriptor] = convert
+
+    for field in descriptor.fields:
+        fields[field] = (field.name, _compile_field(descriptor, field, type_callable_map, use_enum_labels,
+                                                           converters, compiled))
+
+    return convert
+
+
+def _compile_field(descriptor, field, type_callable_map, use_enum_labels, converters, compiled):
+    is_repeated = field.label == FieldDescriptor.LABEL_REPEATED
+
+    if field.type == FieldDescriptor.TYPE_MESSAGE:
+        if field.message_type.has_options and field.message_type.GetOptions().map_entry:
+            return dict
+
+        sub_descriptor = field.message_type
+        message_converter = (converters.get(sub_descriptor) or compiled.get(sub_descriptor) or
+                             _compile_message(sub_descriptor, type_callable_map, use_enum_labels, converters, compiled))
+        if is_repeated:
+            return lambda value_list: [message_converter(value) for value in value_list]
+        return message_converter
+
+    if use_enum_labels and field.type == FieldDescriptor.TYPE_ENUM:
+        values_by_number = field.enum_type.values_by_number
+        if is_repeated:
+            return lambda value_list: [values_by_number[int(value)].name for value in value_list]
+        return lambda value: values_by_number[int(value)].name
+
+    if field.type not in type_callable_map:
+        def unrecognised_type(value):
+            raise TypeError("Field %s.%s has unrecognised type id %d" % (
+                descriptor.name, field.name, field.type))
+        return unrecognised_type
+
+    type_callable = type_callable_map[field.type]
+    if six.PY3 and IDENTITY_TYPE_CALLABLES.get(field.type) is type_callable:
+        # the value is already of the right python type
+        return list if is_repeated else None
+
+    if is_repeated:
+        return lambda value_list: [type_callable(value) for value in value_list]
+    return type_callable
+
+
 def get_bytes(value):
     return base64.b64decode(value)
 
@@ -0,0 +1,132 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+
+class AdaptiveRateLimiter:
+    """
+    Per-account token bucket whose refill rate is adapted with AIMD.
+
+    Every successful RPC raises the rate additively (by about `increase`
+    requests/s per second of successful traffic), every server-side throttle
+    (status code 52) multiplies it by `decrease` and empties the bucket. The
+    limiter therefore settles close to the highest rate the server accepts.
+
+    :param rate: initial rate in requests per second
+    :param burst: bucket size, number of requests allowed back to back
+    :param min_rate: lower bound of the adapted rate
+    :param max_rate: upper bound of the adapted rate
+    :param increase: additive increase in requests/s per second of successes
+    :param decrease: multiplicative decrease factor applied on throttling
+    """
+
+    def __init__(self, rate = 5.0, burst = 1, min_rate = 0.2, max_rate = 20.0, increase = 0.5, decrease = 0.5):
+
+        self.log = logging.getLogger(__name__)
+
+        self._rate = float(rate)
+        self._burst = float(burst)
+        self._min_rate = float(min_rate)
+        self._max_rate = float(max_rate)
+        self._increase = float(increase)
+        self._decrease = float(decrease)
+
+        self._tokens = self._burst
+        self._last_refill = time.time()
+
+        self._successes = 0
+        self._throttles = 0
+        self._waited = 0.0
+
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self._burst, self._tokens + (now - self._last_refill) * self._rate)
+        self._last_refill = now
+
+    def reserve(self):
+        """
+        Takes a token and returns the number of seconds the caller has to
+        wait before sending its request (0 if a token was available).
+        """
+        with self._lock:
+            self._refill(time.time())
+
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+
+            # a negative balance queues the caller behind earlier reservations
+            delay = -self._tokens / self._rate
+            self._waited += delay
+            return delay
+
+    def get_delay(self):
+        """ Seconds until reserve() would return without delay, the bucket is left untouched """
+        with self._lock:
+            self._refill(time.time())
+            if self._tokens >= 1:
+                return 0.0
+            return (1 - self._tokens) / self._rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            self.log.debug('Rate limit reached - waiting %.3fs (rate %.2f/s)', delay, self._rate)
+            time.sleep(delay)
+        return delay
+
+    def on_success(self):
+        with self._lock:
+            self._successes += 1
+            self._rate = min(self._max_rate, self._rate + self._increase / self._rate)
+
+    def on_throttle(self):
+        with self._lock:
+            self._throttles += 1
+            self._refill(time.time())
+            self._rate = max(self._min_rate, self._rate * self._decrease)
+            self._tokens = min(self._tokens, 0.0)
+
+        self.log.info('Request throttled by server - reducing rate to %.2f requests/s', self._rate)
+
+    def get_rate(self):
+        return self._rate
+
+    def get_state(self):
+        with self._lock:
+            self._refill(time.time())
+            return {
+                'rate': self._rate,
+                'tokens': self._tokens,
+                'successes': self._successes,
+                'throttles': self._throttles,
+                'waited': self._waited,
+            }
@@ -0,0 +1,218 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import struct
+
+# nesting depth up to which length-delimited fields are tried as messages,
+# deeper nested groups are treated as invalid wire format
+RECURSION_LIMIT = 10
+
+WIRETYPE_VARINT = 0
+WIRETYPE_FIXED64 = 1
+WIRETYPE_LENGTH_DELIMITED = 2
+WIRETYPE_START_GROUP = 3
+WIRETYPE_END_GROUP = 4
+WIRETYPE_FIXED32 = 5
+
+
+class _DecodeError(ValueError):
+    pass
+
+
+def _read_varint(data, pos, end):
+    result = 0
+    shift = 0
+    while True:
+        if pos >= end or shift >= 64:
+            raise _DecodeError()
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if not b & 0x80:
+            return result & 0xffffffffffffffff, pos
+        shift += 7
+
+
+def _parse_fields(data, pos, end, group_number = None, depth = 0):
+    """
+    Parses the wire format in data[pos:end] into a list of
+    (field number, wire type, value) tuples. Groups are returned as nested
+    lists. Returns the list and the position after the parsed fields.
+    """
+    if depth > RECURSION_LIMIT:
+        raise _DecodeError()
+
+    fields = []
+    while pos < end:
+        tag, pos = _read_varint(data, pos, end)
+        number = tag >> 3
+        wire_type = tag & 7
+        if number == 0:
+            raise _DecodeError()
+
+        if wire_type == WIRETYPE_VARINT:
+            value, pos = _read_varint(data, pos, end)
+        elif wire_type == WIRETYPE_FIXED64:
+            if pos + 8 > end:
+                raise _DecodeError()
+            value = struct.unpack('<Q', bytes(data[pos:pos + 8]))[0]
+            pos += 8
+        elif wire_type == WIRETYPE_LENGTH_DELIMITED:
+            length, pos = _read_varint(data, pos, end)
+            if pos + length > end:
+                raise _DecodeError()
+            value = bytes(data[pos:pos + length])
+            pos += length
+        elif wire_type == WIRETYPE_START_GROUP:
+            value, pos = _parse_fields(data, pos, end, number, depth + 1)
+        elif wire_type == WIRETYPE_END_GROUP:
+            if group_number != number:
+                raise _DecodeError()
+            return fields, pos
+        elif wire_type == WIRETYPE_FIXED32:
+            if pos + 4 > end:
+                raise _DecodeError()
+            value = struct.unpack('<I', bytes(data[pos:pos + 4]))[0]
+            pos += 4
+        else:
+            raise _DecodeError()
+
+        fields.append((number, wire_type, value))
+
+    if group_number is not None:
+        # unterminated group
+        raise _DecodeError()
+
+    return fields, pos
+
+
+def parse_raw(raw):
+    """ Parses protobuf wire format without a schema, returns None if raw is not a valid message """
+    data = bytearray(raw)
+    try:
+        return _parse_fields(data, 0, len(data))[0]
+    except _DecodeError:
+        return None
+
+
+def iter_fields(data, pos = 0, end = None):
+    """
+    Iterates over the fields of a serialized message in a bytearray without
+    copying or decoding nested messages. Yields (field number, wire type,
+    value) tuples, value being the integer of varint and fixed fields and
+    the (start, end) offsets inside data of length-delimited fields.
+    Raises ValueError on invalid wire format or groups.
+    """
+    if end is None:
+        end = len(data)
+
+    while pos < end:
+        tag, pos = _read_varint(data, pos, end)
+        number = tag >> 3
+        wire_type = tag & 7
+        if number == 0:
+            raise _DecodeError()
+
+        if wire_type == WIRETYPE_VARINT:
+            value, pos = _read_varint(data, pos, end)
+        elif wire_type == WIRETYPE_LENGTH_DELIMITED:
+            length, pos = _read_varint(data, pos, end)
+            if pos + length > end:
+                raise _DecodeError()
+            value = (pos, pos + length)
+            pos += length
+        elif wire_type in (WIRETYPE_FIXED64, WIRETYPE_FIXED32):
+            size = 8 if wire_type == WIRETYPE_FIXED64 else 4
+            if pos + size > end:
+                raise _DecodeError()
+            value = struct.unpack('<Q' if size == 8 else '<I', bytes(data[pos:pos + size]))[0]
+            pos += size
+        else:
+            raise _DecodeError()
+
+        yield number, wire_type, value
+
+
+def _c_escape(value):
+    output = []
+    for b in bytearray(value):
+        if b == 0x0a:
+            output.append('\\n')
+        elif b == 0x0d:
+            output.append('\\r')
+        elif b == 0x09:
+            output.append('\\t')
+        elif b == 0x22:
+            output.append('\\"')
+        elif b == 0x27:
+            output.append("\\'")
+        elif b == 0x5c:
+            output.append('\\\\')
+        elif b < 0x20 or b >= 0x7f:
+            output.append('\\%03o' % b)
+        else:
+            output.append(chr(b))
+    return ''.join(output)
+
+
+def _print_fields(fields, lines, indent, recursion_budget):
+    prefix = '  ' * indent
+    for number, wire_type, value in fields:
+        if wire_type == WIRETYPE_VARINT:
+            lines.append('%s%d: %d' % (prefix, number, value))
+        elif wire_type == WIRETYPE_FIXED32:
+            lines.append('%s%d: 0x%08x' % (prefix, number, value))
+        elif wire_type == WIRETYPE_FIXED64:
+            lines.append('%s%d: 0x%016x' % (prefix, number, value))
+        elif wire_type == WIRETYPE_START_GROUP:
+            lines.append('%s%d {' % (prefix, number))
+            _print_fields(value, lines, indent + 1, recursion_budget)
+            lines.append('%s}' % prefix)
+        else:
+            # a length-delimited field which parses as a message probably is one
+            embedded = parse_raw(value) if value and recursion_budget > 0 else None
+            if embedded is not None:
+                lines.append('%s%d {' % (prefix, number))
+                _print_fields(embedded, lines, indent + 1, recursion_budget - 1)
+                lines.append('%s}' % prefix)
+            else:
+                lines.append('%s%d: "%s"' % (prefix, number, _c_escape(value)))
+
+
+def decode_raw(raw):
+    """
+    In-process equivalent of `protoc --decode_raw`: returns the text
+    representation of a protobuf message without knowing its schema.
+    """
+    fields = parse_raw(raw)
+    if fields is None:
+        return 'Failed to parse input.'
+
+    lines = []
+    _print_fields(fields, lines, 0, RECURSION_LIMIT)
+    lines.append('')
+    return '\n'.join(lines)
@@ -0,0 +1,160 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import random
+
+from pgoapi.exceptions import NotLoggedInException, ServerBusyOrOfflineException, ServerSideRequestThrottlingException
+
+RETRY_CONNECTION = 'connection'
+RETRY_SERVER_ERROR = 'server_error'
+RETRY_THROTTLED = 'throttled'
+RETRY_AUTH = 'auth'
+
+
+class ErrorPolicy:
+    """
+    Retry behaviour for one kind of error.
+
+    :param retries: how often this kind of error is retried per call
+    :param base_delay: delay in seconds before the first retry, doubled for
+       every further retry of the same kind
+    :param max_delay: upper bound of the delay in seconds
+    """
+
+    def __init__(self, retries, base_delay, max_delay = 30.0):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+
+DEFAULT_ERROR_POLICIES = {
+    # ServerBusyOrOfflineException - connection refused/reset, DNS errors
+    RETRY_CONNECTION: ErrorPolicy(4, 0.5),
+    # HTTP 5xx
+    RETRY_SERVER_ERROR: ErrorPolicy(4, 1.0),
+    # status code 52
+    RETRY_THROTTLED: ErrorPolicy(3, 2.0),
+    # status code 102 - retried right after a new login
+    RETRY_AUTH: ErrorPolicy(1, 0.0),
+}
+
+
+class RetryPolicy:
+    """
+    Retry policy for PGoApiRequest.call().
+
+    Failed RPCs are retried with exponential backoff per error kind. With
+    jitter enabled the delay is drawn uniformly from [0, backoff] ("full
+    jitter"), so workers failing at the same time don't retry in lockstep.
+    Retrying stops after max_attempts RPCs or when the next retry would start
+    after deadline seconds.
+
+    :param max_attempts: maximum number of RPCs per call, including the first one
+    :param deadline: maximum seconds from the first attempt to the start of the last retry
+    :param jitter: randomize backoff delays
+    :param error_policies: {RETRY_*: ErrorPolicy} overriding DEFAULT_ERROR_POLICIES,
+       a value of None disables retries for that kind
+    """
+
+    def __init__(self, max_attempts = 5, deadline = 60.0, jitter = True, error_policies = None):
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.jitter = jitter
+
+        self.error_policies = dict(DEFAULT_ERROR_POLICIES)
+        if error_policies:
+            self.error_policies.update(error_policies)
+
+    def get_backoff(self, kind, retry):
+        """ Delay before the retry-th (starting at 1) retry of an error kind """
+        policy = self.error_policies[kind]
+        backoff = min(policy.max_delay, policy.base_delay * (2 ** (retry - 1)))
+        if self.jitter:
+            return random.uniform(0, backoff)
+        return backoff
+
+    def start(self, deadline = None):
+        return RetryState(self, deadline)
+
+
+class RetryState:
+    """
+    Attempt bookkeeping of a single call, created by RetryPolicy.start().
+    An optional utilities.Deadline additionally stops retries that could not
+    start before it expires.
+    """
+
+    def __init__(self, policy, deadline = None):
+        self._policy = policy
+        self._deadline = deadline
+        self._deadline_hit = False
+        self._start = time.time()
+        self._attempts = 1
+        self._retries = {}
+
+    def get_attempts(self):
+        return self._attempts
+
+    def is_deadline_exceeded(self):
+        """ True if the deadline expired or cut off a retry """
+        return self._deadline_hit or (self._deadline is not None and self._deadline.expired())
+
+    def next_delay(self, kind):
+        """ Returns the seconds to wait before retrying an error kind, None to give up """
+        policy = self._policy
+        if kind is None or policy is None or policy.error_policies.get(kind) is None:
+            return None
+
+        retry = self._retries.get(kind, 0) + 1
+        if retry > policy.error_policies[kind].retries or self._attempts >= policy.max_attempts:
+            return None
+
+        delay = policy.get_backoff(kind, retry)
+        if policy.deadline is not None and time.time() + delay - self._start > policy.deadline:
+            return None
+        remaining = self._deadline.remaining() if self._deadline is not None else None
+        if remaining is not None and remaining <= delay:
+            self._deadline_hit = True
+            return None
+
+        self._retries[kind] = retry
+        self._attempts += 1
+        return delay
+
+
+def get_retry_kind(error, response, http_status):
+    """ Classifies the outcome of an RPC, returns a RETRY_* kind or None if it succeeded """
+    if isinstance(error, ServerBusyOrOfflineException):
+        return RETRY_CONNECTION
+    elif isinstance(error, ServerSideRequestThrottlingException):
+        return RETRY_THROTTLED
+    elif isinstance(error, NotLoggedInException):
+        return RETRY_AUTH
+    elif response is False and http_status is not None and http_status >= 500:
+        return RETRY_SERVER_ERROR
+    return None
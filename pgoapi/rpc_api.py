@@ -26,36 +26,67 @@ Author: tjado <https://github.com/tejado>
 from __future__ import absolute_import
 
 import re
-import base64
 import random
 import logging
 import requests
-import subprocess
 
 from google.protobuf import message
 
-from importlib import import_module
-
+from pgoapi.transport import HttpTransport
 from pgoapi.protobuf_to_dict import protobuf_to_dict
+from pgoapi.raw_decoder import decode_raw
+from pgoapi.rpc_stats import RpcStats, timer
 from pgoapi.exceptions import NotLoggedInException, ServerBusyOrOfflineException, ServerSideRequestThrottlingException
-from pgoapi.utilities import f2i, h2f, to_camel_case, get_time_ms, get_format_time_diff
+from pgoapi.utilities import f2i, h2f, to_camel_case, get_time_ms, get_format_time_diff, LazyDict, LazyValue
 
 from . import protos
 from POGOProtos.Networking.Envelopes_pb2 import RequestEnvelope
 from POGOProtos.Networking.Envelopes_pb2 import ResponseEnvelope
 from POGOProtos.Networking.Requests_pb2 import RequestType
+from POGOProtos.Networking.Requests import Messages_pb2
+from POGOProtos.Networking import Responses_pb2
+
+
+def _build_request_type_registry():
+    registry = {}
+    unmapped = set()
+
+    for name, value in RequestType.items():
+        proto_name = to_camel_case(name.lower())
+        message_class = getattr(Messages_pb2, proto_name + 'Message', None)
+        response_class = getattr(Responses_pb2, proto_name + 'Response', None)
+
+        registry[value] = (message_class, response_class)
+        if message_class is None or response_class is None:
+            unmapped.add(name)
+
+    return registry, frozenset(unmapped)
+
+# RequestType value -> (Message class, Response class), resolved once at import
+REQUEST_TYPE_REGISTRY, UNMAPPED_REQUEST_TYPES = _build_request_type_registry()
+
+
+RESPONSE_FORMAT_DICT = 'dict'
+RESPONSE_FORMAT_PROTOBUF = 'protobuf'
+RESPONSE_FORMATS = (RESPONSE_FORMAT_DICT, RESPONSE_FORMAT_PROTOBUF)
+
 
 class RpcApi:
 
     RPC_ID = 0
 
-    def __init__(self, auth_provider):
+    def __init__(self, auth_provider, transport = None, response_format = RESPONSE_FORMAT_DICT, rpc_hooks = None):
 
         self.log = logging.getLogger(__name__)
 
-        self._session = requests.session()
-        self._session.headers.update({'User-Agent': 'Niantic App'})
-        self._session.verify = True
+        self._transport = transport or HttpTransport()
+        self._response_format = response_format
+        self._rpc_hooks = rpc_hooks or []
+
+        # last sent envelope and its inputs, reused when the same request is retried
+        self._request_proto = None
+        self._request_key = None
+        self._http_status = None
 
         self._auth_provider = auth_provider
 
@@ -69,68 +100,131 @@ class RpcApi:
 
         return RpcApi.RPC_ID
 
-    def decode_raw(self, raw):
-        output = error = None
-        try:
-            process = subprocess.Popen(['protoc', '--decode_raw'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=True)
-            output, error = process.communicate(raw)
-        except:
-            output = "Couldn't find protoc in your environment OR other issue..."
+    def get_http_status(self):
+        """ HTTP status code of the last response, None if no response was received """
+        return self._http_status
 
-        return output
-
-    def get_class(self, cls):
-        module_, class_ = cls.rsplit('.', 1)
-        class_ = getattr(import_module(module_), class_)
-        return class_
+    def decode_raw(self, raw):
+        return decode_raw(raw)
 
-    def _make_rpc(self, endpoint, request_proto_plain):
+    def _make_rpc(self, endpoint, request_proto_plain, stats = None, deadline = None):
         self.log.debug('Execution of RPC')
 
+        timeout = None
+        if deadline is not None:
+            timeout = deadline.get_timeout(self._transport.get_timeout())
+
+        start = timer()
         request_proto_serialized = request_proto_plain.SerializeToString()
+        serialized = timer()
         try:
-            http_response = self._session.post(endpoint, data=request_proto_serialized)
-        except requests.exceptions.ConnectionError as e:
+            http_response = self._transport.post(endpoint, request_proto_serialized, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
             raise ServerBusyOrOfflineException
+        finally:
+            if stats is not None:
+                stats.serialize_ms = (serialized - start) * 1000
+                stats.network_ms = (timer() - serialized) * 1000
+                stats.request_bytes = len(request_proto_serialized)
 
         return http_response
 
-    def request(self, endpoint, subrequests, player_position):
+    def request(self, endpoint, subrequests, player_position, deadline = None):
 
         if not self._auth_provider or self._auth_provider.is_login() is False:
             raise NotLoggedInException()
 
-        request_proto = self._build_main_request(subrequests, player_position)
-        response = self._make_rpc(endpoint, request_proto)
+        stats = self._create_stats(endpoint, subrequests)
+        try:
+            request_proto = self._get_main_request(subrequests, player_position, stats)
+            response = self._make_rpc(endpoint, request_proto, stats, deadline)
+
+            return self._process_main_response(response, subrequests, stats)
+        except Exception as e:
+            stats.error = e
+            raise
+        finally:
+            self._call_rpc_hooks(stats)
+
+    def _get_main_request(self, subrequests, player_position, stats = None):
+        self._http_status = None
+
+        if self._request_proto is not None:
+            last_subrequests, last_content, last_position = self._request_key
+            if last_subrequests is subrequests and last_content == subrequests and last_position == player_position:
+                return self._refresh_main_request(self._request_proto, stats)
+
+        self._request_proto = self._build_main_request(subrequests, player_position, stats)
+        self._request_key = (subrequests, list(subrequests), player_position)
+        return self._request_proto
+
+    def _create_stats(self, endpoint, subrequests):
+        request_types = []
+        for entry in subrequests:
+            entry_id = entry if isinstance(entry, int) else list(entry.keys())[0]
+            request_types.append(RequestType.Name(entry_id))
+
+        return RpcStats(endpoint, request_types, self._auth_provider.get_username())
+
+    def _call_rpc_hooks(self, stats):
+        for hook in self._rpc_hooks:
+            try:
+                hook(stats)
+            except Exception as e:
+                self.log.warning('RPC hook %s failed: %s', hook, str(e))
+
+    def _process_main_response(self, response, subrequests, stats = None):
+        start = timer()
+        response_proto = self._parse_main_response(response, subrequests)
+        self._http_status = response.status_code
+        if stats is not None:
+            stats.parse_ms = (timer() - start) * 1000
+            stats.http_status = response.status_code
+            stats.response_bytes = len(response.content) if response.content is not None else 0
+
+        if response_proto is False:
+            return False
 
-        response_dict = self._parse_main_response(response, subrequests)
+        if stats is not None:
+            stats.status_code = response_proto.status_code
 
-        if ('auth_ticket' in response_dict) and ('expire_timestamp_ms' in response_dict['auth_ticket']) and (self._auth_provider.is_new_ticket(response_dict['auth_ticket']['expire_timestamp_ms'])):
+        auth_ticket = response_proto.auth_ticket
+        if response_proto.HasField('auth_ticket') and auth_ticket.expire_timestamp_ms and self._auth_provider.is_new_ticket(auth_ticket.expire_timestamp_ms):
             had_ticket = self._auth_provider.has_ticket()
 
-            auth_ticket = response_dict['auth_ticket']
-            self._auth_provider.set_ticket(
-                [auth_ticket['expire_timestamp_ms'], base64.standard_b64decode(auth_ticket['start']), base64.standard_b64decode(auth_ticket['end'])])
+            self._auth_provider.set_ticket([auth_ticket.expire_timestamp_ms, auth_ticket.start, auth_ticket.end])
+            if stats is not None:
+                stats.ticket_refreshed = True
 
             now_ms = get_time_ms()
-            h, m, s = get_format_time_diff(now_ms, auth_ticket['expire_timestamp_ms'], True)
+            h, m, s = get_format_time_diff(now_ms, auth_ticket.expire_timestamp_ms, True)
 
             if had_ticket:
-                self.log.debug('Replacing old auth ticket with new one valid for %02d:%02d:%02d hours (%s < %s)', h, m, s, now_ms, auth_ticket['expire_timestamp_ms'])
+                self.log.debug('Replacing old auth ticket with new one valid for %02d:%02d:%02d hours (%s < %s)', h, m, s, now_ms, auth_ticket.expire_timestamp_ms)
             else:
-                self.log.debug('Received auth ticket valid for %02d:%02d:%02d hours (%s < %s)', h, m, s, now_ms, auth_ticket['expire_timestamp_ms'])
+                self.log.debug('Received auth ticket valid for %02d:%02d:%02d hours (%s < %s)', h, m, s, now_ms, auth_ticket.expire_timestamp_ms)
+
+        sc = response_proto.status_code
+        if sc == 102:
+            raise NotLoggedInException()
+        elif sc == 52:
+            raise ServerSideRequestThrottlingException("Request throttled by server... slow down man")
 
-        if isinstance(response_dict, dict) and 'status_code' in response_dict:
-            sc = response_dict['status_code']
-            if sc == 102:
-                raise NotLoggedInException()
-            elif sc == 52:
-                raise ServerSideRequestThrottlingException("Request throttled by server... slow down man")
+        subresponses = self._parse_sub_responses(response_proto, subrequests)
+
+        if self._response_format == RESPONSE_FORMAT_PROTOBUF:
+            return {'envelope': response_proto, 'responses': subresponses}
+
+        start = timer()
+        response_dict = self._convert_main_response(response_proto, subresponses)
+        if stats is not None:
+            stats.convert_ms = (timer() - start) * 1000
 
         return response_dict
 
-    def _build_main_request(self, subrequests, player_position = None):
+    def _build_main_request(self, subrequests, player_position = None, stats = None):
         self.log.debug('Generating main RPC request...')
+        start = timer()
 
         request = RequestEnvelope()
         request.status_code = 2
@@ -139,25 +233,48 @@ class RpcApi:
         if player_position is not None:
             request.latitude, request.longitude, request.altitude = player_position
 
-        ticket = self._auth_provider.get_ticket()
-        if ticket:
-            self.log.debug('Found auth ticket - using this instead of oauth token')
-            request.auth_ticket.expire_timestamp_ms, request.auth_ticket.start, request.auth_ticket.end = ticket
-        else:
-            self.log.debug('NO auth ticket found - using oauth token')
-            request.auth_info.provider = self._auth_provider.get_name()
-            request.auth_info.token.contents = self._auth_provider.get_token()
-            request.auth_info.token.unknown2 = 59
+        self._set_auth(request)
 
         # unknown stuff
         request.unknown12 = 989
 
         request = self._build_sub_requests(request, subrequests)
 
+        if stats is not None:
+            stats.build_ms = (timer() - start) * 1000
+            stats.request_id = request.request_id
+
         self.log.debug('Generated protobuf request: \n\r%s', request )
 
         return request
 
+    def _refresh_main_request(self, request, stats = None):
+        """ Prepares an already sent envelope for a retry: new request id and current auth """
+        self.log.debug('Refreshing main RPC request for retry...')
+        start = timer()
+
+        request.request_id = self.get_rpc_id()
+        request.ClearField('auth_ticket')
+        request.ClearField('auth_info')
+        self._set_auth(request)
+
+        if stats is not None:
+            stats.build_ms = (timer() - start) * 1000
+            stats.request_id = request.request_id
+
+        return request
+
+    def _set_auth(self, request):
+        ticket = self._auth_provider.get_ticket()
+        if ticket:
+            self.log.debug('Found auth ticket - using this instead of oauth token')
+            request.auth_ticket.expire_timestamp_ms, request.auth_ticket.start, request.auth_ticket.end = ticket
+        else:
+            self.log.debug('NO auth ticket found - using oauth token')
+            request.auth_info.provider = self._auth_provider.get_name()
+            request.auth_info.token.contents = self._auth_provider.get_token()
+            request.auth_info.token.unknown2 = 59
+
     def _build_sub_requests(self, mainrequest, subrequest_list):
         self.log.debug('Generating sub RPC requests...')
 
@@ -169,11 +286,14 @@ class RpcApi:
 
                 entry_name = RequestType.Name(entry_id)
 
-                proto_name = to_camel_case(entry_name.lower()) + 'Message'
-                proto_classname = 'POGOProtos.Networking.Requests.Messages_pb2.' + proto_name
-                subrequest_extension = self.get_class(proto_classname)()
+                message_class = REQUEST_TYPE_REGISTRY[entry_id][0]
+                if message_class is None:
+                    raise Exception('No protobuf message definition for {} - arguments can not be sent'.format(entry_name))
+
+                proto_name = message_class.__name__
+                subrequest_extension = message_class()
 
-                self.log.debug("Subrequest class: %s", proto_classname)
+                self.log.debug("Subrequest class: %s", proto_name)
 
                 for (key, value) in entry_content.items():
                     if isinstance(value, list):
@@ -235,23 +355,15 @@ class RpcApi:
             self.log.warning('Could not parse response: %s', str(e))
             return False
 
-        self.log.debug('Protobuf structure of rpc response:\n\r%s', response_proto)
-        try:
-            self.log.debug('Decode raw over protoc (protoc has to be in your PATH):\n\r%s', self.decode_raw(response_raw.content).decode('utf-8'))
-        except:
-            self.log.debug('Error during protoc parsing - ignored.')
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug('Protobuf structure of rpc response:\n\r%s', response_proto)
+            self.log.debug('Decode raw:\n\r%s', self.decode_raw(response_raw.content))
 
-        response_proto_dict = protobuf_to_dict(response_proto)
-        response_proto_dict = self._parse_sub_responses(response_proto, subrequests, response_proto_dict)
-
-        return response_proto_dict
+        return response_proto
 
-    def _parse_sub_responses(self, response_proto, subrequests_list, response_proto_dict):
+    def _parse_sub_responses(self, response_proto, subrequests_list):
         self.log.debug('Parsing sub RPC responses...')
-        response_proto_dict['responses'] = {}
-
-        if 'returns' in response_proto_dict:
-            del response_proto_dict['returns']
+        subresponses = LazyDict()
 
         list_len = len(subrequests_list) -1
         i = 0
@@ -266,30 +378,44 @@ class RpcApi:
                 entry_id =  list(request_entry.items())[0][0]
 
             entry_name = RequestType.Name(entry_id)
-            proto_name = to_camel_case(entry_name.lower()) + 'Response'
-            proto_classname = 'POGOProtos.Networking.Responses_pb2.' + proto_name
-
-            self.log.debug("Parsing class: %s", proto_classname)
 
-            subresponse_return = None
-            try:
-                subresponse_extension = self.get_class(proto_classname)()         
-            except Exception as e:
-                subresponse_extension = None
-                error = 'Protobuf definition for {} not found'.format(proto_classname)
-                subresponse_return = error
-                self.log.debug(error)
-
-            if subresponse_extension:
-                try: 
-                    subresponse_extension.ParseFromString(subresponse)
-                    subresponse_return = protobuf_to_dict(subresponse_extension)
-                except:
-                    error = "Protobuf definition for {} seems not to match".format(proto_classname)
-                    subresponse_return = error
-                    self.log.debug(error)
-
-            response_proto_dict['responses'][entry_name] = subresponse_return
+            # subresponses are only parsed (and converted) on first access
+            subresponses[entry_name] = LazyValue('{} ({} bytes)'.format(entry_name, len(subresponse)),
+                self._decode_sub_response, entry_id, subresponse)
             i += 1
 
+        return subresponses
+
+    def _decode_sub_response(self, entry_id, subresponse):
+        entry_name = RequestType.Name(entry_id)
+        response_class = REQUEST_TYPE_REGISTRY.get(entry_id, (None, None))[1]
+
+        if response_class is None:
+            proto_classname = 'POGOProtos.Networking.Responses_pb2.' + to_camel_case(entry_name.lower()) + 'Response'
+            error = 'Protobuf definition for {} not found'.format(proto_classname)
+            self.log.debug(error)
+            return error
+
+        proto_classname = response_class.__name__
+        self.log.debug("Parsing class: %s", proto_classname)
+
+        try:
+            subresponse_extension = response_class()
+            subresponse_extension.ParseFromString(subresponse)
+            if self._response_format == RESPONSE_FORMAT_PROTOBUF:
+                return subresponse_extension
+            return protobuf_to_dict(subresponse_extension)
+        except:
+            error = "Protobuf definition for {} seems not to match".format(proto_classname)
+            self.log.debug(error)
+            return error
+
+    def _convert_main_response(self, response_proto, subresponses):
+        # the raw subresponses are kept (undecoded) in the subresponse
+        # mapping, so don't waste time on encoding them here
+        response_proto.ClearField('returns')
+
+        response_proto_dict = protobuf_to_dict(response_proto)
+        response_proto_dict['responses'] = subresponses
+
         return response_proto_dict
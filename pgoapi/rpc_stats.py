@@ -0,0 +1,84 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import timeit
+
+timer = timeit.default_timer
+
+
+class RpcStats:
+    """
+    Timing breakdown and sizes of a single RPC, passed to every hook
+    registered with PGoApi.add_rpc_hook() once the RPC finished.
+
+    All durations are in milliseconds:
+
+    build_ms       building the request envelope including subrequests
+    serialize_ms   serializing the request envelope
+    network_ms     HTTP round trip
+    parse_ms       parsing the response envelope
+    convert_ms     converting the response envelope to a dict
+
+    ticket_refreshed is set if the response carried a new auth ticket.
+
+    Subresponses are decoded lazily on first access, after the hooks ran, so
+    their timing is not part of RpcStats. The parse + conversion time of
+    every subresponse decoded so far is returned by
+    response['responses'].get_load_ms() as {request type: milliseconds}.
+    """
+
+    def __init__(self, endpoint, request_types, account = None):
+        self.endpoint = endpoint
+        self.request_types = request_types
+        self.account = account
+        self.request_id = None
+        self.timestamp = time.time()
+
+        self.build_ms = None
+        self.serialize_ms = None
+        self.network_ms = None
+        self.parse_ms = None
+        self.convert_ms = None
+
+        self.request_bytes = None
+        self.response_bytes = None
+        self.http_status = None
+        self.status_code = None
+        self.ticket_refreshed = False
+
+        self.error = None
+
+    def get_total_ms(self):
+        return sum(t for t in (self.build_ms, self.serialize_ms, self.network_ms, self.parse_ms, self.convert_ms) if t)
+
+    def __repr__(self):
+        timings = ' '.join('{}={:.2f}ms'.format(name, getattr(self, name + '_ms')) for name in
+            ('build', 'serialize', 'network', 'parse', 'convert') if getattr(self, name + '_ms') is not None)
+        return '<RpcStats {} {} {} bytes_out={} bytes_in={} http={} status={} error={!r}>'.format(
+            self.account, ','.join(self.request_types), timings, self.request_bytes, self.response_bytes,
+            self.http_status, self.status_code, self.error)
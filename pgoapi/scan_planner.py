@@ -0,0 +1,179 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import math
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from pgoapi.utilities import EARTH_RADIUS
+
+log = logging.getLogger(__name__)
+
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+# radius in meters around the player in which GET_MAP_OBJECTS returns wild pokemon
+DEFAULT_SCAN_RADIUS = 70
+
+
+def _point_in_polygon(x, y, polygon):
+    inside = False
+    x1, y1 = polygon[-1]
+    for x2, y2 in polygon:
+        if (y2 > y) != (y1 > y) and x < (x1 - x2) * (y - y2) / (y1 - y2) + x2:
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def _segment_distance(x, y, x1, y1, x2, y2):
+    dx, dy = x2 - x1, y2 - y1
+    length = dx * dx + dy * dy
+    t = 0.0 if length == 0 else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / length))
+    return math.hypot(x - x1 - t * dx, y - y1 - t * dy)
+
+
+def _select(points, radius, polygon, scan_radius):
+    """ Pure python: points (row, x, y) whose scan circle reaches the area """
+    selected = []
+    for row, x, y in points:
+        if polygon is None:
+            keep = math.hypot(x, y) < radius + scan_radius
+        else:
+            keep = _point_in_polygon(x, y, polygon) or any(
+                _segment_distance(x, y, polygon[i - 1][0], polygon[i - 1][1], polygon[i][0], polygon[i][1]) < scan_radius
+                for i in range(len(polygon)))
+        if keep:
+            selected.append((row, x, y))
+    return selected
+
+
+def _select_numpy(rows, xs, ys, radius, polygon, scan_radius):
+    """ Vectorized _select(), returns the mask of the points to keep """
+    if polygon is None:
+        return numpy.hypot(xs, ys) < radius + scan_radius
+
+    inside = numpy.zeros(len(xs), dtype=bool)
+    near = numpy.zeros(len(xs), dtype=bool)
+    for i in range(len(polygon)):
+        (x1, y1), (x2, y2) = polygon[i - 1], polygon[i]
+
+        if y1 != y2:
+            crossing = ((y2 > ys) != (y1 > ys)) & (xs < (x1 - x2) * (ys - y2) / (y1 - y2) + x2)
+            inside ^= crossing
+
+        dx, dy = x2 - x1, y2 - y1
+        length = dx * dx + dy * dy
+        t = numpy.zeros(len(xs)) if length == 0 else numpy.clip(((xs - x1) * dx + (ys - y1) * dy) / length, 0.0, 1.0)
+        near |= numpy.hypot(xs - x1 - t * dx, ys - y1 - t * dy) < scan_radius
+
+    return inside | near
+
+
+def plan_scan(lat = None, lng = None, radius = None, polygon = None, scan_radius = DEFAULT_SCAN_RADIUS):
+    """
+    Scan positions covering a disc of radius meters around (lat, lng) or a
+    polygon of (lat, lng) vertices (not crossing the antimeridian) with
+    circles of scan_radius meters.
+
+    Positions lie on a hexagonal grid - the sparsest layout of circles
+    without gaps - of which only those reaching the area are kept. They are
+    ordered as a walking route going back and forth along the grid rows, so
+    consecutive positions are about scan_radius * sqrt(3) apart. Uses numpy
+    if it is installed.
+
+    :return: [(lat, lng)]
+    """
+    if polygon is not None:
+        lat = sum(vertex[0] for vertex in polygon) / float(len(polygon))
+        lng = sum(vertex[1] for vertex in polygon) / float(len(polygon))
+    elif lat is None or lng is None or radius is None:
+        raise ValueError('plan_scan() needs either a polygon or lat, lng and radius')
+
+    # equirectangular projection to meters around the center
+    scale_x = METERS_PER_DEGREE * math.cos(math.radians(lat))
+    scale_y = METERS_PER_DEGREE
+
+    if polygon is not None:
+        polygon = [((vertex[1] - lng) * scale_x, (vertex[0] - lat) * scale_y) for vertex in polygon]
+        min_x = min(vertex[0] for vertex in polygon) - scan_radius
+        max_x = max(vertex[0] for vertex in polygon) + scan_radius
+        min_y = min(vertex[1] for vertex in polygon) - scan_radius
+        max_y = max(vertex[1] for vertex in polygon) + scan_radius
+    else:
+        min_x = min_y = -radius - scan_radius
+        max_x = max_y = radius + scan_radius
+
+    step_x = math.sqrt(3) * scan_radius
+    step_y = 1.5 * scan_radius
+    first_row, last_row = int(math.floor(min_y / step_y)), int(math.ceil(max_y / step_y))
+    first_col, last_col = int(math.floor(min_x / step_x)) - 1, int(math.ceil(max_x / step_x)) + 1
+
+    if numpy is not None:
+        rows, cols = numpy.mgrid[first_row:last_row + 1, first_col:last_col + 1]
+        rows, cols = rows.ravel(), cols.ravel()
+        xs = (cols + 0.5 * (rows % 2)) * step_x
+        ys = rows * step_y
+
+        mask = _select_numpy(rows, xs, ys, radius, polygon, scan_radius)
+        rows, xs, ys = rows[mask], xs[mask], ys[mask]
+
+        # every other row is walked backwards
+        order = numpy.lexsort((numpy.where(rows % 2, -xs, xs), rows))
+        lats = lat + ys[order] / scale_y
+        lngs = lng + xs[order] / scale_x
+        points = list(zip(lats.tolist(), lngs.tolist()))
+    else:
+        candidates = []
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                candidates.append((row, (col + 0.5 * (row % 2)) * step_x, row * step_y))
+
+        selected = _select(candidates, radius, polygon, scan_radius)
+        selected.sort(key=lambda point: (point[0], -point[1] if point[0] % 2 else point[1]))
+        points = [(lat + y / scale_y, lng + x / scale_x) for row, x, y in selected]
+
+    log.debug('Planned %s scan positions', len(points))
+    return points
+
+
+def partition_route(points, count):
+    """ Splits an ordered route into count consecutive parts differing in length by at most one point """
+    if count < 1:
+        raise ValueError('Invalid number of route parts {} - has to be at least 1.'.format(count))
+
+    size, rest = divmod(len(points), count)
+    parts = []
+    start = 0
+    for i in range(count):
+        end = start + size + (1 if i < rest else 0)
+        parts.append(points[start:end])
+        start = end
+    return parts
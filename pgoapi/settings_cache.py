@@ -0,0 +1,137 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from pgoapi.protobuf_to_dict import protobuf_to_dict
+from pgoapi.utilities import write_file_atomic
+
+from . import protos
+from POGOProtos.Networking.Responses_pb2 import DownloadSettingsResponse
+
+# settings hash sent by the login sequence if nothing is cached yet
+DEFAULT_SETTINGS_HASH = '05daf51635c82611d1aac95c0b051d3ec088a930'
+
+
+class SettingsCache:
+    """
+    Cache of the GlobalSettings returned by DOWNLOAD_SETTINGS, keyed by their hash.
+
+    The login sequence sends the cached hash, so the server only returns
+    settings if they changed. By default all PGoApi instances of a process
+    share one in-memory cache (get_default_settings_cache()); with a path the
+    last DownloadSettingsResponse is also persisted and reloaded on start.
+    """
+
+    def __init__(self, path = None):
+
+        self.log = logging.getLogger(__name__)
+
+        self._path = path
+        self._lock = threading.Lock()
+
+        self._hash = None
+        self._raw = None
+        self._settings = None
+
+        if path is not None:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self._path, 'rb') as f:
+                raw = f.read()
+        except (IOError, OSError):
+            return
+
+        response = DownloadSettingsResponse()
+        try:
+            response.ParseFromString(raw)
+        except Exception as e:
+            self.log.warning('Ignoring corrupt settings cache %s: %s', self._path, e)
+            return
+
+        if response.hash and response.HasField('settings'):
+            self._hash, self._raw = response.hash, raw
+            self.log.debug('Loaded settings %s from %s', self._hash, self._path)
+
+    def get_hash(self):
+        return self._hash
+
+    def get_settings(self):
+        """ Returns the cached GlobalSettings (parsed once) or None """
+        with self._lock:
+            if self._settings is None and self._raw is not None:
+                response = DownloadSettingsResponse()
+                response.ParseFromString(self._raw)
+                self._settings = response.settings
+            return self._settings
+
+    def get_settings_dict(self):
+        settings = self.get_settings()
+        if settings is None:
+            return None
+        return protobuf_to_dict(settings)
+
+    def update(self, response):
+        """
+        Takes the DownloadSettingsResponse of a DOWNLOAD_SETTINGS call, returns
+        True if it carried new settings.
+        """
+        if not response.hash or not response.HasField('settings'):
+            return False
+
+        with self._lock:
+            if response.hash == self._hash:
+                return False
+
+            self._hash = response.hash
+            self._settings = response.settings
+            self._raw = response.SerializeToString()
+            raw = self._raw
+
+        self.log.info('Received new settings %s', response.hash)
+
+        if self._path is not None:
+            try:
+                write_file_atomic(self._path, raw)
+            except (IOError, OSError) as e:
+                self.log.warning('Could not write settings cache %s: %s', self._path, e)
+
+        return True
+
+
+_default_settings_cache = SettingsCache()
+
+def get_default_settings_cache():
+    """ SettingsCache shared by all PGoApi instances which were not given their own """
+    return _default_settings_cache
+
+def set_default_settings_cache(settings_cache):
+    global _default_settings_cache
+    _default_settings_cache = settings_cache
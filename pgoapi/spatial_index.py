@@ -0,0 +1,199 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import math
+import heapq
+import logging
+import threading
+
+from bisect import bisect_left, insort
+
+from s2sphere import CellId, LatLng, LatLngRect, LineInterval, RegionCoverer, SphereInterval
+
+from pgoapi.map_state import REMOVED
+from pgoapi.utilities import EARTH_RADIUS, get_cap
+
+
+def get_distance(lat1, lng1, lat2, lng2):
+    """ Great circle distance in meters (haversine) """
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """
+    In-memory spatial index of map objects (FortData, SpawnPoint, WildPokemon,
+    MapPokemon - messages or dicts) bucketed by S2 cell.
+
+    Objects are stored in buckets of S2 cells at `level` (15: ~300m), the
+    sorted bucket ids allow to find all buckets below any S2 cell by binary
+    search. Radius and bounding box queries cover their region with at most
+    `max_cells` S2 cells and only check the objects of the buckets inside
+    that covering. Nearest neighbour queries search growing radii.
+
+    apply_changes() keeps the index in sync with a MapState:
+
+        map_state.add_listener(index.apply_changes)
+
+    :param level: S2 level of the buckets
+    :param max_cells: maximum number of cells of a query covering
+    """
+
+    def __init__(self, level = 15, max_cells = 8):
+
+        self.log = logging.getLogger(__name__)
+
+        self._level = level
+        self._max_cells = max_cells
+
+        self._lock = threading.RLock()
+        self._buckets = {}
+        self._bucket_ids = []
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, entry_key):
+        return entry_key in self._entries
+
+    def insert(self, kind, key, lat, lng, obj):
+        """ Adds or moves the object (kind, key) """
+        bucket_id = CellId.from_lat_lng(LatLng.from_degrees(lat, lng)).parent(self._level).id()
+        entry_key = (kind, key)
+
+        with self._lock:
+            self._remove(entry_key)
+
+            bucket = self._buckets.get(bucket_id)
+            if bucket is None:
+                bucket = self._buckets[bucket_id] = {}
+                insort(self._bucket_ids, bucket_id)
+
+            entry = (lat, lng, kind, key, obj)
+            bucket[entry_key] = entry
+            self._entries[entry_key] = bucket_id
+
+    def insert_object(self, kind, key, obj):
+        """ Adds an object with latitude/longitude fields, returns False for objects without position """
+        if isinstance(obj, dict):
+            lat, lng = obj.get('latitude'), obj.get('longitude')
+        else:
+            lat, lng = getattr(obj, 'latitude', None), getattr(obj, 'longitude', None)
+
+        if lat is None or lng is None:
+            return False
+
+        self.insert(kind, key, lat, lng, obj)
+        return True
+
+    def remove(self, kind, key):
+        with self._lock:
+            return self._remove((kind, key))
+
+    def _remove(self, entry_key):
+        bucket_id = self._entries.pop(entry_key, None)
+        if bucket_id is None:
+            return False
+
+        bucket = self._buckets[bucket_id]
+        del bucket[entry_key]
+        if not bucket:
+            del self._buckets[bucket_id]
+            del self._bucket_ids[bisect_left(self._bucket_ids, bucket_id)]
+        return True
+
+    def apply_changes(self, changes):
+        """ Applies MapChanges of a MapState, objects without position are skipped """
+        for change in changes:
+            if change.action == REMOVED:
+                self.remove(change.kind, change.key)
+            else:
+                self.insert_object(change.kind, change.key, change.obj)
+
+    def _iter_entries(self, region):
+        coverer = RegionCoverer()
+        coverer.min_level = 0
+        coverer.max_level = self._level
+        coverer.max_cells = self._max_cells
+
+        for cell_id in coverer.get_covering(region):
+            end = cell_id.range_max().id()
+            i = bisect_left(self._bucket_ids, cell_id.range_min().id())
+            while i < len(self._bucket_ids) and self._bucket_ids[i] <= end:
+                for entry in self._buckets[self._bucket_ids[i]].values():
+                    yield entry
+                i += 1
+
+    def query_radius(self, lat, lng, radius, kind = None):
+        """ [(distance in meters, object)] of all objects within radius meters, nearest first """
+        with self._lock:
+            result = []
+            for entry_lat, entry_lng, entry_kind, key, obj in self._iter_entries(get_cap(lat, lng, radius)):
+                if kind is not None and entry_kind != kind:
+                    continue
+
+                distance = get_distance(lat, lng, entry_lat, entry_lng)
+                if distance <= radius:
+                    result.append((distance, obj))
+
+        result.sort(key=lambda item: item[0])
+        return result
+
+    def query_bbox(self, lat_lo, lng_lo, lat_hi, lng_hi, kind = None):
+        """ All objects inside a bounding box, lng_lo > lng_hi crosses the antimeridian """
+        rect = LatLngRect(LineInterval(math.radians(lat_lo), math.radians(lat_hi)),
+                          SphereInterval(math.radians(lng_lo), math.radians(lng_hi)))
+
+        with self._lock:
+            result = []
+            for entry_lat, entry_lng, entry_kind, key, obj in self._iter_entries(rect):
+                if kind is not None and entry_kind != kind:
+                    continue
+                if not lat_lo <= entry_lat <= lat_hi:
+                    continue
+                if lng_lo <= lng_hi:
+                    inside = lng_lo <= entry_lng <= lng_hi
+                else:
+                    inside = entry_lng >= lng_lo or entry_lng <= lng_hi
+                if inside:
+                    result.append(obj)
+            return result
+
+    def query_nearest(self, lat, lng, k = 1, kind = None, max_distance = None):
+        """ [(distance in meters, object)] of the k nearest objects, nearest first """
+        # start with about the edge length of a bucket and double the radius
+        radius = 2 * math.pi * EARTH_RADIUS / (4 * 2 ** self._level)
+        limit = math.pi * EARTH_RADIUS if max_distance is None else max_distance
+
+        while True:
+            radius = min(radius, limit)
+            found = self.query_radius(lat, lng, radius, kind)
+            if len(found) >= k or radius >= limit:
+                return heapq.nsmallest(k, found, key=lambda item: item[0])
+            radius *= 2
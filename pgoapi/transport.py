@@ -0,0 +1,100 @@
+"""
+pgoapi - Pokemon Go API
+Copyright (c) 2016 tjado <https://github.com/tejado>
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+OR OTHER DEALINGS IN THE SOFTWARE.
+
+Author: tjado <https://github.com/tejado>
+"""
+
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+import requests
+
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (10, 30)
+
+class HttpTransport:
+    """
+    Long-lived HTTP transport for RPC calls.
+
+    Keeps a keep-alive connection pool which is shared by every request
+    created through the same PGoApi instance, so DNS, TCP and TLS handshakes
+    are only paid once per connection instead of once per RPC.
+
+    :param pool_connections: number of per-host connection pools to cache
+    :param pool_maxsize: maximum number of connections kept alive per host
+    :param idle_timeout: seconds of inactivity after which all pooled
+       connections are dropped (None keeps them until the server closes them)
+    :param timeout: default (connect, read) timeout in seconds for every request
+    """
+
+    def __init__(self, pool_connections = 4, pool_maxsize = 10, idle_timeout = 60, timeout = DEFAULT_TIMEOUT):
+
+        self.log = logging.getLogger(__name__)
+
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._idle_timeout = idle_timeout
+        self._timeout = timeout
+
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+        self._session = requests.session()
+        self._session.headers.update({'User-Agent': 'Niantic App'})
+        self._session.verify = True
+        self._session.mount('https://', self._adapter)
+        self._session.mount('http://', self._adapter)
+
+        self._lock = threading.Lock()
+        self._last_used = time.time()
+
+    def get_timeout(self):
+        return self._timeout
+
+    def set_timeout(self, timeout):
+        self._timeout = timeout
+
+    def get_pool_config(self):
+        return (self._pool_connections, self._pool_maxsize, self._idle_timeout)
+
+    def _check_idle(self):
+        if self._idle_timeout is None:
+            return
+
+        with self._lock:
+            now = time.time()
+            if now - self._last_used > self._idle_timeout:
+                self.log.debug('Connection pool idle for %.1fs - dropping pooled connections', now - self._last_used)
+                self._adapter.close()
+            self._last_used = now
+
+    def post(self, url, data, timeout = None, **kwargs):
+        self._check_idle()
+        if timeout is None:
+            timeout = self._timeout
+        return self._session.post(url, data=data, timeout=timeout, **kwargs)
+
+    def close(self):
+        self._session.close()
@@ -23,20 +23,38 @@ OR OTHER DEALINGS IN THE SOFTWARE.
 Author: tjado <https://github.com/tejado>
 """
 
+import os
 import re
+import math
 import time
 import struct
 import logging
+import timeit
+import tempfile
+import threading
+
+import six
 
 from json import JSONEncoder
+from collections import OrderedDict
+
+try:
+    from collections.abc import ItemsView, ValuesView
+except ImportError:
+    from collections import ItemsView, ValuesView
+
+from pgoapi.exceptions import DeadlineExceededException
 
 # other stuff
 from google.protobuf.internal import encoder
 from geopy.geocoders import GoogleV3
-from s2sphere import Cell, CellId, LatLng
+from s2sphere import Angle, Cap, Cell, LatLng, LatLngRect, RegionCoverer
 
 log = logging.getLogger(__name__)
 
+# mean earth radius in meters as used by S2
+EARTH_RADIUS = 6371010.0
+
 def i2f(long):
   return struct.unpack('<d', struct.pack('<Q', long))[0]
 
@@ -57,6 +75,190 @@ class JSONByteEncoder(JSONEncoder):
     def default(self, o):
         return o.decode('utf-8')
 
+class LazyValue(object):
+    """ Placeholder inside a LazyDict, loaded by calling loader(*args) on first access """
+
+    __slots__ = ('_loader', '_args', '_description')
+
+    def __init__(self, description, loader, *args):
+        self._description = description
+        self._loader = loader
+        self._args = args
+
+    def load(self):
+        return self._loader(*self._args)
+
+    def __repr__(self):
+        return '<not decoded yet: {}>'.format(self._description)
+
+# dict whose LazyValue entries are loaded on first access and then memoized.
+# Every accessor (including items(), values(), the python 2 iter*/view*
+# methods, iteration based copies, json and pprint) returns loaded values,
+# only repr() shows the placeholders. get_load_ms() tells how long loading
+# each of the loaded entries took.
+class LazyDict(dict):
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self._load_ms = {}
+
+    def _load(self, key, value):
+        if isinstance(value, LazyValue):
+            start = timeit.default_timer()
+            value = value.load()
+            self._load_ms[key] = (timeit.default_timer() - start) * 1000
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get_load_ms(self):
+        """ {key: milliseconds} of the entries loaded so far """
+        return dict(self._load_ms)
+
+    def __getitem__(self, key):
+        return self._load(key, dict.__getitem__(self, key))
+
+    def __iter__(self):
+        # defining __iter__ makes dict(lazy_dict) go through keys()/__getitem__
+        return dict.__iter__(self)
+
+    def get(self, key, default = None):
+        if key in self:
+            return self[key]
+        return default
+
+    def items(self):
+        return [(key, self[key]) for key in list(dict.keys(self))]
+
+    def values(self):
+        return [self[key] for key in list(dict.keys(self))]
+
+    if six.PY2:
+        def iteritems(self):
+            for key in list(dict.keys(self)):
+                yield (key, self[key])
+
+        def itervalues(self):
+            for key in list(dict.keys(self)):
+                yield self[key]
+
+        def viewitems(self):
+            return ItemsView(self)
+
+        def viewvalues(self):
+            return ValuesView(self)
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            dict.__delitem__(self, key)
+            return value
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        if isinstance(value, LazyValue):
+            value = value.load()
+        return (key, value)
+
+    def setdefault(self, key, default = None):
+        if key in self:
+            return self[key]
+        return dict.setdefault(self, key, default)
+
+    def copy(self):
+        copy = LazyDict(dict.items(self))
+        copy._load_ms = dict(self._load_ms)
+        return copy
+
+    def is_loaded(self, key):
+        return not isinstance(dict.__getitem__(self, key), LazyValue)
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+class LRUCache:
+    """
+    Thread-safe mapping holding at most maxsize entries. Reads and writes
+    mark an entry as used, the least recently used one is evicted first and
+    passed to on_evict(key, value).
+    """
+
+    def __init__(self, maxsize, on_evict = None):
+        self._maxsize = maxsize
+        self._on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default = None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        evicted = []
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self._maxsize:
+                evicted.append(self._data.popitem(last=False))
+
+        if self._on_evict is not None:
+            for evicted_key, evicted_value in evicted:
+                self._on_evict(evicted_key, evicted_value)
+
+    def pop(self, key, default = None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def get_maxsize(self):
+        return self._maxsize
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+# GetMapObjectsResponse.status of a successful map query
+MAP_OBJECTS_SUCCESS = 1
+
+def get_map_cells(response):
+    """
+    Returns the map cells (dicts or MapCell messages) of a response (dict or
+    protobuf format) containing a successful GET_MAP_OBJECTS, otherwise None.
+    """
+    try:
+        map_objects = response['responses']['GET_MAP_OBJECTS']
+    except (KeyError, TypeError):
+        return None
+
+    if isinstance(map_objects, dict):
+        if map_objects.get('status') != MAP_OBJECTS_SUCCESS:
+            return None
+        return map_objects.get('map_cells', [])
+    elif hasattr(map_objects, 'map_cells'):
+        if map_objects.status != MAP_OBJECTS_SUCCESS:
+            return None
+        return map_objects.map_cells
+    return None
+
 def get_pos_by_name(location_name):
     geolocator = GoogleV3()
     loc = geolocator.geocode(location_name, timeout=10)
@@ -68,21 +270,145 @@ def get_pos_by_name(location_name):
 
     return (loc.latitude, loc.longitude, loc.altitude)
 
-def get_cell_ids(lat, long, radius = 10):
-    origin = CellId.from_lat_lng(LatLng.from_degrees(lat, long)).parent(15)
-    walk = [origin.id()]
-    right = origin.next()
-    left = origin.prev()
-
-    # Search around provided radius
-    for i in range(radius):
-        walk.append(right.id())
-        walk.append(left.id())
-        right = right.next()
-        left = left.prev()
-
-    # Return everything
-    return sorted(walk)
+def get_cap(lat, long, radius):
+    """ S2 Cap (disc) of radius meters around a position """
+    angle = Angle.from_radians(min(math.pi, radius / EARTH_RADIUS))
+    return Cap.from_axis_angle(LatLng.from_degrees(lat, long).to_point(), angle)
+
+def _point_in_polygon(lat, long, polygon):
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, long_i = polygon[i]
+        lat_j, long_j = polygon[j]
+        if (long_i > long) != (long_j > long) and lat < (lat_j - lat_i) * (long - long_i) / (long_j - long_i) + lat_i:
+            inside = not inside
+        j = i
+    return inside
+
+def _segments_intersect(a, b, c, d):
+    def ccw(p, q, r):
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+    return ccw(a, b, c) * ccw(a, b, d) <= 0 and ccw(c, d, a) * ccw(c, d, b) <= 0
+
+def _polygon_intersects_cell(polygon, cell):
+    vertices = []
+    for k in range(4):
+        vertex = LatLng.from_point(cell.get_vertex(k))
+        vertices.append((vertex.lat().degrees, vertex.lng().degrees))
+
+    if any(_point_in_polygon(lat, long, polygon) for lat, long in vertices):
+        return True
+    if any(cell.contains(LatLng.from_degrees(lat, long).to_point()) for lat, long in polygon):
+        return True
+    for i in range(len(polygon)):
+        for k in range(4):
+            if _segments_intersect(polygon[i - 1], polygon[i], vertices[k - 1], vertices[k]):
+                return True
+    return False
+
+def _get_covering(lat, long, radius, level, polygon):
+    coverer = RegionCoverer()
+    coverer.min_level = level
+    coverer.max_level = level
+    coverer.max_cells = 1000000
+
+    if polygon is None:
+        return [cell_id.id() for cell_id in coverer.get_covering(get_cap(lat, long, radius))]
+
+    lats = [vertex[0] for vertex in polygon]
+    longs = [vertex[1] for vertex in polygon]
+    rect = LatLngRect.from_point_pair(LatLng.from_degrees(min(lats), min(longs)),
+                                      LatLng.from_degrees(max(lats), max(longs)))
+    return [cell_id.id() for cell_id in coverer.get_covering(rect)
+            if _polygon_intersects_cell(polygon, Cell(cell_id))]
+
+# positions are rounded to ~1m before covering, radii to full meters
+CELL_COVER_PRECISION = 5
+_cell_cover_cache = LRUCache(4096)
+
+def get_cell_ids(lat, long, radius = 500, level = 15, polygon = None):
+    """
+    Sorted ids of all S2 cells at level (15: ~300m) intersecting the disc of
+    radius meters around a position or, if given, a polygon of (lat, long)
+    vertices (not crossing the antimeridian). Coverings are cached in an LRU
+    keyed by the rounded position, radius and polygon.
+    """
+    if polygon is not None:
+        polygon = tuple((round(vertex[0], CELL_COVER_PRECISION), round(vertex[1], CELL_COVER_PRECISION)) for vertex in polygon)
+        key = (polygon, level)
+    else:
+        lat, long = round(lat, CELL_COVER_PRECISION), round(long, CELL_COVER_PRECISION)
+        key = (lat, long, int(round(radius)), level)
+
+    cell_ids = _cell_cover_cache.get(key)
+    if cell_ids is None:
+        cell_ids = tuple(sorted(_get_covering(lat, long, radius, level, polygon)))
+        _cell_cover_cache.set(key, cell_ids)
+    return list(cell_ids)
+
+class Deadline:
+    """
+    Absolute point in time an operation (including all its retries and login
+    steps) has to be finished by. A timeout of None never expires.
+    """
+
+    def __init__(self, timeout = None):
+        self._expires = None if timeout is None else time.time() + timeout
+
+    @classmethod
+    def from_value(cls, value):
+        """ Accepts a Deadline, a timeout in seconds or None """
+        if value is None or isinstance(value, Deadline):
+            return value
+        return cls(value)
+
+    def remaining(self):
+        if self._expires is None:
+            return None
+        return max(0.0, self._expires - time.time())
+
+    def expired(self):
+        return self._expires is not None and time.time() >= self._expires
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceededException('Deadline exceeded')
+
+    def get_timeout(self, timeout):
+        """
+        Clips a timeout (seconds, (connect, read) tuple or None) to the time
+        remaining until the deadline.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if remaining <= 0:
+            raise DeadlineExceededException('Deadline exceeded')
+
+        if timeout is None:
+            return remaining
+        elif isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+        return min(timeout, remaining)
+
+# os.replace (py3.3+) also overwrites existing files on Windows
+_replace = getattr(os, 'replace', os.rename)
+
+def write_file_atomic(path, data):
+    """
+    Writes bytes to path through a temporary file in the same directory, so
+    a concurrent reader sees either the old or the new content. The file is
+    created readable by the owner only.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp_')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        _replace(tmp_path, path)
+    except:
+        os.remove(tmp_path)
+        raise
 
 def get_time_ms():
     return int(round(time.time() * 1000))
@@ -27,7 +27,6 @@ Author: tjado <https://github.com/tejado>
 import os
 import sys
 import json
-import time
 import pprint
 import logging
 import getpass
@@ -39,6 +38,7 @@ sys.path.append(os.path.dirname(os.path.realpath(__file__)))
 # import Pokemon Go API lib
 from pgoapi import pgoapi
 from pgoapi import utilities as util
+from pgoapi.rate_limiter import AdaptiveRateLimiter
 
 
 log = logging.getLogger(__name__)
@@ -105,6 +105,9 @@ def main():
     # instantiate pgoapi
     api = pgoapi.PGoApi()
 
+    # adapt the request rate to server-side throttling instead of sleeping a fixed time
+    api.set_rate_limiter(AdaptiveRateLimiter())
+
     # parse position
     position = util.get_pos_by_name(config.location)
     if not position:
@@ -123,9 +126,6 @@ def main():
     # ----------------------
     response_dict = api.get_player()
     print('Response dictionary (get_player): \n\r{}'.format(pprint.PrettyPrinter(indent=4).pformat(response_dict)))
-    
-    # sleep 200ms due to server-side throttling
-    time.sleep(0.2)
 
     # get player profile + inventory call (thread-safe/chaining example)
     # ----------------------
@@ -0,0 +1,40 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pgoapi.inventory import Inventory
+
+from pgoapi import protos
+from POGOProtos.Networking.Responses_pb2 import GetInventoryResponse
+
+
+class InventoryTest(unittest.TestCase):
+
+    def _response(self, timestamp_ms, original_timestamp_ms = 0):
+        response = GetInventoryResponse(success=True)
+        response.inventory_delta.new_timestamp_ms = timestamp_ms
+        response.inventory_delta.original_timestamp_ms = original_timestamp_ms
+        return response
+
+    def test_delete_pokemon_with_high_bit_id(self):
+        pokemon_id = 0xF000000000000001
+        inventory = Inventory()
+
+        response = self._response(1000)
+        item = response.inventory_delta.inventory_items.add()
+        item.inventory_item_data.pokemon_data.id = pokemon_id
+        item.inventory_item_data.pokemon_data.pokemon_id = 16
+        self.assertTrue(inventory.apply(response))
+        self.assertIsNotNone(inventory.get_pokemon(pokemon_id))
+
+        # deleted_item_key is a signed int64 and arrives negative
+        response = self._response(2000, 1000)
+        response.inventory_delta.inventory_items.add().deleted_item_key = pokemon_id - (1 << 64)
+        self.assertTrue(inventory.apply(response))
+
+        self.assertIsNone(inventory.get_pokemon(pokemon_id))
+        self.assertEqual(inventory.get_pokemon_by_species(16), [])
+
+
+if __name__ == '__main__':
+    unittest.main()